@@ -7,17 +7,19 @@ from aiogram import Bot, Dispatcher
 from aiogram.fsm.storage.memory import MemoryStorage
 from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 
+from core.config import Config
+from core.log import setup_logging, shutdown_logging, parse_levels
 from core.middleware import RoleMiddleware
 from core.database.model import Base
 
-# Настройка логгера для SQLAlchemy
-logging.basicConfig()
-logging.getLogger('sqlalchemy.engine').setLevel(logging.DEBUG)
 load_dotenv()
 
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+# Логи пишутся из фонового потока (уровни и семплирование - в .env)
+setup_logging(
+    level=Config.LOG_LEVEL,
+    json_format=Config.LOG_FORMAT == "json",
+    levels=parse_levels(Config.LOG_LEVELS),
+    sampling={name: float(rate) for name, rate in parse_levels(Config.LOG_SAMPLING).items()}
 )
 logger = logging.getLogger(__name__)
 
@@ -34,7 +36,6 @@ async def main():
     # Настройка подключения к БД
     engine = create_async_engine(
         DATABASE_URL,
-        echo=True,
         pool_pre_ping=True,
         pool_recycle=3600
     )
@@ -63,6 +64,7 @@ async def main():
     finally:
         await engine.dispose()
         logger.info("Подключения к БД закрыты")
+        shutdown_logging()
 
 if __name__ == "__main__":
     asyncio.run(main())
@@ -0,0 +1,69 @@
+import os
+from dotenv import load_dotenv
+
+# Загрузка переменных окружения
+load_dotenv()
+
+
+class Config:
+    """Настройки приложения из переменных окружения"""
+    BOT_TOKEN = os.getenv("BOT_TOKEN")
+
+    # Основная БД (все записи)
+    DATABASE_URL = os.getenv("DATABASE_URL")
+
+    # Реплика для чтения (опционально)
+    REPLICA_DATABASE_URL = os.getenv("REPLICA_DATABASE_URL")
+    # Допустимое отставание реплики в секундах
+    REPLICA_MAX_LAG = float(os.getenv("REPLICA_MAX_LAG", "5"))
+    # Сколько секунд после записи читать данные пользователя с основной БД
+    READ_AFTER_WRITE_WINDOW = float(os.getenv("READ_AFTER_WRITE_WINDOW", "10"))
+    # Как часто перепроверять состояние реплики
+    REPLICA_CHECK_INTERVAL = float(os.getenv("REPLICA_CHECK_INTERVAL", "5"))
+    # Таймаут подключения к реплике (с)
+    REPLICA_CONNECT_TIMEOUT = float(os.getenv("REPLICA_CONNECT_TIMEOUT", "2"))
+
+    # Конфигурация полнотекстового поиска Postgres для тикетов
+    TICKET_SEARCH_LANGUAGE = os.getenv("TICKET_SEARCH_LANGUAGE", "russian")
+
+    # Бюджет SQL на один апдейт: при превышении - предупреждение в логе
+    SQL_BUDGET_STATEMENTS = int(os.getenv("SQL_BUDGET_STATEMENTS", "5"))
+    SQL_BUDGET_MS = float(os.getenv("SQL_BUDGET_MS", "100"))
+
+    # Количество процессов-воркеров (1 - обработка в одном процессе).
+    # Память процессов не общая: role_events и кеши в памяти - у каждого воркера свои
+    WORKERS = int(os.getenv("WORKERS", "1"))
+    # Размер очереди апдейтов каждого воркера
+    WORKER_QUEUE_SIZE = int(os.getenv("WORKER_QUEUE_SIZE", "10000"))
+    # Максимум апдейтов, одновременно обрабатываемых воркером
+    WORKER_MAX_IN_FLIGHT = int(os.getenv("WORKER_MAX_IN_FLIGHT", "100"))
+    # Сколько ждать завершения воркера при остановке
+    WORKER_SHUTDOWN_TIMEOUT = float(os.getenv("WORKER_SHUTDOWN_TIMEOUT", "30"))
+
+    # Снимок FSM при остановке: путь, срок жизни записей (с) и лимит размера (байт)
+    FSM_SNAPSHOT_PATH = os.getenv("FSM_SNAPSHOT_PATH", ".cache/fsm.snapshot")
+    FSM_SNAPSHOT_MAX_AGE = float(os.getenv("FSM_SNAPSHOT_MAX_AGE", "86400"))
+    FSM_SNAPSHOT_MAX_BYTES = int(os.getenv("FSM_SNAPSHOT_MAX_BYTES", str(64 * 1024 * 1024)))
+
+    # Период записи накопленных изменений username (с)
+    USERNAME_FLUSH_INTERVAL = float(os.getenv("USERNAME_FLUSH_INTERVAL", "5"))
+    # Как часто писать метрики очереди username в лог (INFO), с
+    USERNAME_STATS_INTERVAL = float(os.getenv("USERNAME_STATS_INTERVAL", "300"))
+
+    # Логирование
+    LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
+    # json или text
+    LOG_FORMAT = os.getenv("LOG_FORMAT", "json")
+    # Уровни отдельных логгеров: "sqlalchemy.engine=INFO,core.middleware=DEBUG"
+    LOG_LEVELS = os.getenv("LOG_LEVELS", "")
+    # Доля DEBUG-записей по логгерам (с дочерними): "core=0.01,core.middleware=0.1"
+    LOG_SAMPLING = os.getenv("LOG_SAMPLING", "")
+
+    # Marzban API
+    MARZBAN_URL = os.getenv("MARZBAN_URL", "")
+    MARZBAN_USERNAME = os.getenv("MARZBAN_USERNAME")
+    MARZBAN_PASSWORD = os.getenv("MARZBAN_PASSWORD")
+
+    # Кеш ссылок подписки (секунды) и каталог для QR-кодов
+    SUBSCRIPTION_CACHE_TTL = float(os.getenv("SUBSCRIPTION_CACHE_TTL", "600"))
+    QR_CACHE_DIR = os.getenv("QR_CACHE_DIR", ".cache/qr")
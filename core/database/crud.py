@@ -1,8 +1,10 @@
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, exc
+from sqlalchemy import select, update, insert, exc, func, literal_column, or_, and_, table, column, exists, values, text, BigInteger, String
 from sqlalchemy.orm import selectinload
-from core.database.model import User, Subscription, Ticket
-from typing import Optional, List, Tuple
+from core.database.model import User, Subscription, Ticket, RoleAudit, MailingDelivery
+from core.database.schema import SEARCH_LANGUAGE
+from typing import Dict, Optional, List, Tuple, Sequence
+from datetime import datetime
 import logging
 
 logger = logging.getLogger(__name__)
@@ -47,6 +49,27 @@ async def get_user_by_telegram_id(
         logger.error(f"Ошибка при получении пользователя {telegram_id}: {str(e)}", exc_info=True)
         return None
 
+async def get_user_subscription(
+    session: AsyncSession,
+    telegram_id: int
+) -> Optional[Subscription]:
+    """Действующая подписка пользователя (с самым поздним сроком), истекшие не учитываются"""
+    try:
+        result = await session.execute(
+            select(Subscription)
+            .join(User, User.id == Subscription.user_id)
+            .where(
+                User.telegram_id == telegram_id,
+                Subscription.expires_at > func.now()
+            )
+            .order_by(Subscription.expires_at.desc())
+            .limit(1)
+        )
+        return result.scalars().first()
+    except Exception as e:
+        logger.error(f"Ошибка при получении подписки пользователя {telegram_id}: {str(e)}", exc_info=True)
+        return None
+
 # Новый расширенный метод
 async def get_user_full_data(
     session: AsyncSession,
@@ -84,3 +107,281 @@ async def get_user_full_data(
             exc_info=True
         )
         return None
+
+ROLES = ("ADMIN", "SUPPORT", "USER", "BANNED")
+
+async def bulk_set_role(
+    session: AsyncSession,
+    role: str,
+    telegram_ids: Optional[Sequence[int]] = None,
+    username_pattern: Optional[str] = None,
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+    from_role: Optional[str] = None,
+    performed_by: Optional[int] = None,
+    reason: Optional[str] = None,
+    chunk_size: int = 1000
+) -> List[int]:
+    """
+    Массовая смена роли:
+    - выборка по списку telegram_id, шаблону username (ILIKE) и/или окну created_at
+    - from_role ограничивает выборку пользователями с указанной текущей ролью
+    - один UPDATE ... RETURNING telegram_id на пачку, аудит - bulk insert
+    - пользователи, у которых роль уже такая, и сам администратор не затрагиваются
+    - commit выполняет вызывающий код, после него - role_events.publish
+    Возвращает telegram_id измененных пользователей.
+    """
+    role = role.upper()
+    if role not in ROLES:
+        raise ValueError(f"Unknown role: {role}")
+    if telegram_ids is None and not (username_pattern or created_from or created_to):
+        raise ValueError("At least one selection criterion is required")
+
+    conditions = [User.role != role]
+    if username_pattern:
+        conditions.append(User.username.ilike(username_pattern))
+    if created_from:
+        conditions.append(User.created_at >= created_from)
+    if created_to:
+        conditions.append(User.created_at < created_to)
+    if from_role:
+        conditions.append(User.role == from_role.upper())
+    if performed_by is not None:
+        conditions.append(User.id != performed_by)
+
+    def chunk_statements():
+        if telegram_ids is not None:
+            ids = list(dict.fromkeys(telegram_ids))
+            for start in range(0, len(ids), chunk_size):
+                yield User.telegram_id.in_(ids[start:start + chunk_size])
+        else:
+            # Обновленные строки выпадают из выборки (role != :role), поэтому
+            # каждый проход берет следующую пачку, пока она не станет пустой
+            while True:
+                yield User.id.in_(
+                    select(User.id)
+                    .where(*conditions)
+                    .order_by(User.id)
+                    .limit(chunk_size)
+                    .scalar_subquery()
+                )
+
+    changed: List[int] = []
+    for chunk_condition in chunk_statements():
+        result = await session.execute(
+            update(User)
+            .where(chunk_condition, *conditions)
+            .values(role=role)
+            .returning(User.telegram_id)
+            .execution_options(synchronize_session=False)
+        )
+        chunk_ids = list(result.scalars())
+        if not chunk_ids:
+            if telegram_ids is None:
+                break
+            continue
+
+        await session.execute(
+            insert(RoleAudit),
+            [
+                {
+                    "telegram_id": telegram_id,
+                    "role": role,
+                    "reason": reason,
+                    "performed_by": performed_by
+                }
+                for telegram_id in chunk_ids
+            ]
+        )
+        changed.extend(chunk_ids)
+
+    logger.info(
+        "Роль %s назначена %s пользователям (performed_by=%s)",
+        role, len(changed), performed_by
+    )
+    return changed
+
+# FTS5-таблица для SQLite (создается в core.database.schema)
+tickets_fts = table("tickets_fts", column("rowid"), column("message"))
+
+def _fts5_query(query: str) -> str:
+    """Слова пользователя как фразы FTS5 - без спецсинтаксиса"""
+    return " ".join('"' + word.replace('"', '""') + '"' for word in query.split())
+
+async def search_tickets(
+    session: AsyncSession,
+    query: str,
+    status: Optional[str] = None,
+    assigned_to: Optional[int] = None,
+    after: Optional[Tuple[float, int]] = None,
+    limit: int = 20
+) -> List[Tuple[Ticket, float]]:
+    """
+    Полнотекстовый поиск по тикетам:
+    - сортировка по релевантности, затем по id (по убыванию)
+    - фильтры status/assigned_to в том же запросе
+    - keyset-пагинация: after = (rank, id) последнего тикета предыдущей страницы
+    Возвращает список (Ticket, rank).
+    """
+    if not query.split():
+        return []
+
+    if session.bind.dialect.name == "postgresql":
+        search_vector = literal_column("tickets.search_vector")
+        # Та же конфигурация, что в выражении колонки (имя проверено в schema)
+        ts_query = func.websearch_to_tsquery(literal_column(f"'{SEARCH_LANGUAGE}'::regconfig"), query)
+        rank = func.ts_rank_cd(search_vector, ts_query)
+        stmt = select(Ticket, rank.label("rank")).where(search_vector.op("@@")(ts_query))
+    else:
+        # bm25: меньше - релевантнее, поэтому со знаком минус
+        rank = -func.bm25(literal_column("tickets_fts"))
+        stmt = (
+            select(Ticket, rank.label("rank"))
+            .join(tickets_fts, tickets_fts.c.rowid == Ticket.id)
+            .where(literal_column("tickets_fts").op("MATCH")(_fts5_query(query)))
+        )
+
+    if status:
+        stmt = stmt.where(Ticket.status == status)
+    if assigned_to is not None:
+        stmt = stmt.where(Ticket.assigned_to == assigned_to)
+    if after:
+        after_rank, after_id = after
+        stmt = stmt.where(or_(
+            rank < after_rank,
+            and_(rank == after_rank, Ticket.id < after_id)
+        ))
+
+    result = await session.execute(
+        stmt.order_by(rank.desc(), Ticket.id.desc()).limit(limit)
+    )
+    return [(ticket, float(ticket_rank)) for ticket, ticket_rank in result.all()]
+
+DELIVERY_COLUMNS = ("mailing_id", "user_id", "status", "error")
+
+async def insert_mailing_deliveries(
+    session: AsyncSession,
+    rows: Sequence[Tuple[int, int, str, Optional[str]]]
+) -> None:
+    """
+    Пакетная запись результатов доставки (mailing_id, user_id, status, error):
+    COPY на asyncpg, executemany на остальных драйверах.
+    """
+    if not rows:
+        return
+    if session.bind.dialect.driver == "asyncpg":
+        # Адаптер asyncpg открывает транзакцию лениво, на первом запросе.
+        # COPY идет мимо него - без этого запроса он закоммитится отдельно от сессии
+        await session.execute(select(1))
+        connection = await session.connection()
+        raw_connection = await connection.get_raw_connection()
+        await raw_connection.driver_connection.copy_records_to_table(
+            MailingDelivery.__tablename__,
+            records=rows,
+            columns=DELIVERY_COLUMNS
+        )
+    else:
+        await session.execute(
+            insert(MailingDelivery),
+            [dict(zip(DELIVERY_COLUMNS, row)) for row in rows]
+        )
+
+async def mark_users_blocked(session: AsyncSession, user_ids: Sequence[int]) -> None:
+    """Отметка пользователей, заблокировавших бота"""
+    if user_ids:
+        await session.execute(
+            update(User)
+            .where(User.id.in_(user_ids), User.blocked_bot_at.is_(None))
+            .values(blocked_bot_at=func.now())
+            .execution_options(synchronize_session=False)
+        )
+
+async def get_mailing_recipients(
+    session: AsyncSession,
+    mailing_id: int,
+    after_id: int = 0,
+    limit: int = 1000,
+    retry_failed: bool = False
+) -> List[Tuple[int, int]]:
+    """
+    Получатели рассылки (id, telegram_id) пачками по возрастанию id:
+    - без заблокированных (BANNED) и заблокировавших бота
+    - без тех, кому рассылка уже доставлена или кто заблокировал бота
+    - retry_failed: только пользователи с неудачной попыткой
+    """
+    def delivered_with(*statuses):
+        return exists().where(
+            MailingDelivery.mailing_id == mailing_id,
+            MailingDelivery.user_id == User.id,
+            MailingDelivery.status.in_(statuses)
+        )
+
+    stmt = (
+        select(User.id, User.telegram_id)
+        .where(
+            User.id > after_id,
+            User.role != "BANNED",
+            User.blocked_bot_at.is_(None),
+            ~delivered_with("SENT", "BLOCKED")
+        )
+        .order_by(User.id)
+        .limit(limit)
+    )
+    if retry_failed:
+        stmt = stmt.where(delivered_with("FAILED"))
+
+    result = await session.execute(stmt)
+    return [(user_id, telegram_id) for user_id, telegram_id in result.all()]
+
+async def update_usernames(
+    session: AsyncSession,
+    changes: Sequence[Tuple[int, Optional[str]]]
+) -> int:
+    """
+    Пакетное обновление username (telegram_id, username) одним запросом
+    UPDATE ... FROM (VALUES ...). Возвращает число измененных строк.
+    """
+    if not changes:
+        return 0
+    if session.bind.dialect.name == "postgresql":
+        v = values(
+            column("telegram_id", BigInteger),
+            column("username", String),
+            name="v"
+        ).data(list(changes))
+        stmt = (
+            update(User)
+            .where(
+                User.telegram_id == v.c.telegram_id,
+                User.username.is_distinct_from(v.c.username)
+            )
+            .values(username=v.c.username)
+            .execution_options(synchronize_session=False)
+        )
+        result = await session.execute(stmt)
+    else:
+        # SQLite не поддерживает список колонок в алиасе VALUES - задаем его через CTE
+        rows = ", ".join(f"(:t{i}, :u{i})" for i in range(len(changes)))
+        params = {}
+        for i, (telegram_id, username) in enumerate(changes):
+            params[f"t{i}"] = telegram_id
+            params[f"u{i}"] = username
+        await session.execute(text(
+            f"WITH v(telegram_id, username) AS (VALUES {rows}) "
+            "UPDATE users SET username = v.username, updated_at = CURRENT_TIMESTAMP "
+            "FROM v WHERE users.telegram_id = v.telegram_id AND users.username IS NOT v.username"
+        ), params)
+        # sqlite3 отдает rowcount = -1 для запросов, начинающихся с WITH
+        return await session.scalar(text("SELECT changes()"))
+    return result.rowcount
+
+async def get_mailing_delivery_counts(session: AsyncSession, mailing_id: int) -> Dict[str, int]:
+    """Число записей доставки рассылки по статусам (за все запуски)"""
+    result = await session.execute(
+        select(MailingDelivery.status, func.count())
+        .where(MailingDelivery.mailing_id == mailing_id)
+        .group_by(MailingDelivery.status)
+    )
+    counts = {"SENT": 0, "FAILED": 0, "BLOCKED": 0}
+    counts.update({status: count for status, count in result.all()})
+    return counts
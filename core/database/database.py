@@ -1,16 +1,16 @@
+from sqlalchemy import make_url
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
 from sqlalchemy.orm import declarative_base
-from dotenv import load_dotenv
-import os  
-
-# Загрузка переменных окружения
-load_dotenv()
+from core.config import Config
+from core.database.routing import SessionRouter
+from core.database.instrumentation import instrument_engine
 
 # Получаем URL БД из .env
-DATABASE_URL = os.getenv("DATABASE_URL")  # Добавляем эту строку
+DATABASE_URL = Config.DATABASE_URL
 
 #Создаем асинхронный движок
 engine = create_async_engine(DATABASE_URL)
+instrument_engine(engine)
 
 Base = declarative_base()
 
@@ -19,3 +19,40 @@ async_session = async_sessionmaker(
     expire_on_commit=False,
     class_=AsyncSession
 )
+
+def _replica_connect_args(url: str) -> dict:
+    """Короткий таймаут подключения: недоступная реплика не должна держать запросы"""
+    if make_url(url).get_driver_name() == "asyncpg":
+        return {"timeout": Config.REPLICA_CONNECT_TIMEOUT}
+    return {}
+
+# Реплика для чтения (если задана в .env)
+replica_engine = (
+    create_async_engine(
+        Config.REPLICA_DATABASE_URL,
+        pool_pre_ping=True,
+        connect_args=_replica_connect_args(Config.REPLICA_DATABASE_URL)
+    )
+    if Config.REPLICA_DATABASE_URL else None
+)
+
+if replica_engine:
+    instrument_engine(replica_engine)
+
+replica_session = (
+    async_sessionmaker(
+        bind=replica_engine,
+        expire_on_commit=False,
+        class_=AsyncSession
+    )
+    if replica_engine else None
+)
+
+# Чтение - с реплики, запись и read-your-writes - с основной БД
+session_router = SessionRouter(
+    primary=async_session,
+    replica=replica_session,
+    max_lag=Config.REPLICA_MAX_LAG,
+    read_after_write_window=Config.READ_AFTER_WRITE_WINDOW,
+    check_interval=Config.REPLICA_CHECK_INTERVAL
+)
@@ -0,0 +1,90 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Iterator, List, Optional
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+import time
+
+
+@dataclass
+class QueryStats:
+    """Счетчики SQL-запросов в рамках одного апдейта (или блока кода)"""
+    statements: int = 0
+    # Строки по данным драйвера (asyncpg сообщает их и для SELECT, sqlite - нет)
+    rows: int = 0
+    db_time: float = 0.0
+    # Тексты запросов - только если включена запись (для сообщений в тестах)
+    record: bool = False
+    log: List[str] = field(default_factory=list)
+
+    @property
+    def db_ms(self) -> float:
+        return round(self.db_time * 1000, 2)
+
+
+# Текущие счетчики; listener'ы SQLAlchemy видят их и внутри greenlet'ов async-движка
+current_stats: ContextVar[Optional[QueryStats]] = ContextVar("query_stats", default=None)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info["query_started"].pop()
+    stats = current_stats.get()
+    if stats is None:
+        return
+    stats.statements += 1
+    stats.db_time += time.perf_counter() - started
+    if cursor.rowcount and cursor.rowcount > 0:
+        stats.rows += cursor.rowcount
+    if stats.record:
+        stats.log.append(statement)
+
+
+def _handle_error(context):
+    # Запрос упал - after_cursor_execute не будет вызван
+    if context.connection is not None:
+        started = context.connection.info.get("query_started")
+        if started:
+            started.pop()
+
+
+def instrument_engine(engine: AsyncEngine) -> None:
+    """Подключает подсчет запросов к движку (повторный вызов ничего не делает)"""
+    sync_engine = engine.sync_engine
+    if event.contains(sync_engine, "after_cursor_execute", _after_cursor_execute):
+        return
+    event.listen(sync_engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(sync_engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(sync_engine, "handle_error", _handle_error)
+
+
+@contextmanager
+def track_queries(record: bool = False) -> Iterator[QueryStats]:
+    """Считает запросы, выполненные внутри блока"""
+    stats = QueryStats(record=record)
+    token = current_stats.set(stats)
+    try:
+        yield stats
+    finally:
+        current_stats.reset(token)
+
+
+@contextmanager
+def assert_max_queries(limit: int) -> Iterator[QueryStats]:
+    """
+    Для тестов: падает, если внутри блока выполнено больше limit запросов.
+
+        with assert_max_queries(3):
+            await show_profile(callback)
+    """
+    with track_queries(record=True) as stats:
+        yield stats
+    if stats.statements > limit:
+        queries = "\n".join(f"  {i}. {sql}" for i, sql in enumerate(stats.log, 1))
+        raise AssertionError(
+            f"Expected at most {limit} SQL statements, got {stats.statements}:\n{queries}"
+        )
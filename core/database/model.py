@@ -15,6 +15,7 @@ class User(Base):
     __table_args__ = (
         Index('idx_user_telegram_id', 'telegram_id'),
         Index('idx_user_username', 'username'),
+        Index('idx_user_created_at', 'created_at'),
         CheckConstraint(
             "role IN ('ADMIN', 'SUPPORT', 'USER', 'BANNED')", 
             name="check_user_role"
@@ -26,6 +27,8 @@ class User(Base):
     username = Column(String(255), nullable=True, index=True)
     role = Column(String(20), nullable=False, server_default="USER")
     balance = Column(Integer, default=0, nullable=False)
+    # Когда пользователь заблокировал бота (рассылки его пропускают)
+    blocked_bot_at = Column(DateTime, nullable=True)
     created_at = Column(DateTime, server_default=func.now())
     updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
 
@@ -83,6 +86,25 @@ class Mailing(Base):
     # Relationship
     creator = relationship("User", back_populates="mailings")
 
+class MailingDelivery(Base):
+    __tablename__ = "mailing_deliveries"
+    __table_args__ = (
+        Index('idx_delivery_mailing_status', 'mailing_id', 'status'),
+        Index('idx_delivery_mailing_user', 'mailing_id', 'user_id'),
+        CheckConstraint(
+            "status IN ('SENT', 'FAILED', 'BLOCKED')", 
+            name="check_delivery_status"
+        ),
+    )
+
+    # BigInteger не автоинкрементный в SQLite
+    id = Column(BigInteger().with_variant(Integer, "sqlite"), primary_key=True)
+    mailing_id = Column(Integer, ForeignKey("mailings.id", ondelete="CASCADE"), nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    status = Column(String(20), nullable=False)
+    error = Column(String(255))
+    created_at = Column(DateTime, server_default=func.now())
+
 class Ticket(Base):
     __tablename__ = "tickets"
     __table_args__ = (
@@ -105,3 +127,21 @@ class Ticket(Base):
     # Relationships
     user = relationship("User", back_populates="tickets", foreign_keys=[user_id])
     assigned_support = relationship("User", foreign_keys=[assigned_to])
+
+class RoleAudit(Base):
+    __tablename__ = "role_audit"
+    __table_args__ = (
+        Index('idx_role_audit_telegram_id', 'telegram_id'),
+        Index('idx_role_audit_created', 'created_at'),
+        CheckConstraint(
+            "role IN ('ADMIN', 'SUPPORT', 'USER', 'BANNED')", 
+            name="check_role_audit_role"
+        ),
+    )
+
+    id = Column(Integer, primary_key=True)
+    telegram_id = Column(BigInteger, nullable=False)
+    role = Column(String(20), nullable=False)
+    reason = Column(String(255))
+    created_at = Column(DateTime, server_default=func.now())
+    performed_by = Column(Integer, ForeignKey("users.id", ondelete="SET NULL"))
@@ -0,0 +1,159 @@
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, Optional
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+import asyncio
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+# Отставание реплики Postgres в секундах.
+# Если все полученные WAL уже применены - реплика актуальна (0),
+# на основной БД функции возвращают NULL.
+PG_REPLICA_LAG_SQL = text(
+    "SELECT CASE "
+    "WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+    "ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()) "
+    "END"
+)
+
+
+class SessionRouter:
+    """
+    Маршрутизация сессий между основной БД и репликой:
+    - read() отдает сессию реплики, если она доступна и не отстает
+    - write() всегда отдает сессию основной БД и запоминает время записи
+    - после записи пользователь некоторое время читает с основной БД
+    Состояние реплики проверяется фоновой задачей, read() смотрит только на флаг.
+    """
+
+    def __init__(
+        self,
+        primary: async_sessionmaker[AsyncSession],
+        replica: Optional[async_sessionmaker[AsyncSession]] = None,
+        max_lag: float = 5.0,
+        read_after_write_window: float = 10.0,
+        check_interval: float = 5.0
+    ):
+        self.primary = primary
+        self.replica = replica
+        self.max_lag = max_lag
+        self.read_after_write_window = read_after_write_window
+        self.check_interval = check_interval
+
+        self._last_writes: Dict[int, float] = {}
+        # До первой проверки читаем с основной БД
+        self._replica_ok = False
+        self._monitor: Optional[asyncio.Task] = None
+
+    def mark_write(self, telegram_id: Optional[int]) -> None:
+        """Запоминает запись от пользователя для read-your-writes"""
+        if telegram_id is None or self.replica is None:
+            return
+        now = time.monotonic()
+        self._last_writes[telegram_id] = now
+
+        # Периодически чистим устаревшие отметки
+        if len(self._last_writes) > 10000:
+            border = now - self.read_after_write_window
+            self._last_writes = {
+                tg_id: ts for tg_id, ts in self._last_writes.items() if ts > border
+            }
+
+    def _recently_wrote(self, telegram_id: Optional[int]) -> bool:
+        if telegram_id is None:
+            return False
+        written_at = self._last_writes.get(telegram_id)
+        if written_at is None:
+            return False
+        if time.monotonic() - written_at > self.read_after_write_window:
+            del self._last_writes[telegram_id]
+            return False
+        return True
+
+    async def _check_replica(self) -> bool:
+        """Проверка доступности и отставания реплики"""
+        try:
+            async with self.replica() as session:
+                if session.bind.dialect.name == "postgresql":
+                    lag = (await session.execute(PG_REPLICA_LAG_SQL)).scalar()
+                else:
+                    await session.execute(text("SELECT 1"))
+                    lag = None
+            lag = float(lag or 0)
+            healthy = lag <= self.max_lag
+            if not healthy:
+                logger.warning("Реплика отстает на %.1f с, чтение идет с основной БД", lag)
+        except Exception as e:
+            logger.warning("Реплика недоступна, чтение идет с основной БД: %s", e)
+            healthy = False
+
+        if healthy and not self._replica_ok:
+            logger.info("Реплика снова доступна для чтения")
+        self._replica_ok = healthy
+        return healthy
+
+    def _mark_replica_down(self) -> None:
+        # Снова включит следующая фоновая проверка
+        self._replica_ok = False
+
+    async def _monitor_replica(self) -> None:
+        while True:
+            await self._check_replica()
+            await asyncio.sleep(self.check_interval)
+
+    def _ensure_monitor(self) -> None:
+        """Фоновая проверка запускается при первом чтении (в цикле событий процесса)"""
+        if self._monitor is None or self._monitor.done():
+            self._monitor = asyncio.create_task(self._monitor_replica())
+
+    async def close(self) -> None:
+        if self._monitor:
+            self._monitor.cancel()
+            try:
+                await self._monitor
+            except asyncio.CancelledError:
+                pass
+            self._monitor = None
+
+    @asynccontextmanager
+    async def read(self, telegram_id: Optional[int] = None) -> AsyncIterator[AsyncSession]:
+        """Сессия для запросов только на чтение"""
+        if self.replica is not None:
+            self._ensure_monitor()
+        use_replica = (
+            self.replica is not None
+            and self._replica_ok
+            and not self._recently_wrote(telegram_id)
+        )
+        if not use_replica:
+            async with self.primary() as session:
+                yield session
+            return
+
+        session = self.replica()
+        try:
+            # Соединение берется лениво - проверяем его до передачи сессии
+            await session.connection()
+        except Exception as e:
+            logger.warning("Ошибка подключения к реплике, переключаемся на основную БД: %s", e)
+            self._mark_replica_down()
+            await session.close()
+            async with self.primary() as session:
+                yield session
+            return
+
+        try:
+            yield session
+        finally:
+            await session.close()
+
+    @asynccontextmanager
+    async def write(self, telegram_id: Optional[int] = None) -> AsyncIterator[AsyncSession]:
+        """Сессия основной БД для записи"""
+        async with self.primary() as session:
+            try:
+                yield session
+            finally:
+                self.mark_write(telegram_id)
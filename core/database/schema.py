@@ -0,0 +1,93 @@
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection
+from core.config import Config
+import logging
+import re
+
+logger = logging.getLogger(__name__)
+
+# Имя конфигурации Postgres подставляется в DDL - только буквы/цифры/_
+SEARCH_LANGUAGE = Config.TICKET_SEARCH_LANGUAGE
+if not re.fullmatch(r"\w+", SEARCH_LANGUAGE):
+    raise ValueError(f"Invalid TICKET_SEARCH_LANGUAGE: {SEARCH_LANGUAGE}")
+
+PG_TICKET_SEARCH = [
+    f"""
+    ALTER TABLE tickets ADD COLUMN IF NOT EXISTS search_vector tsvector
+    GENERATED ALWAYS AS (to_tsvector('{SEARCH_LANGUAGE}'::regconfig, coalesce(message, ''))) STORED
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_ticket_search ON tickets USING GIN (search_vector)",
+]
+
+SQLITE_TICKET_SEARCH = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS tickets_fts
+    USING fts5(message, content='tickets', content_rowid='id', tokenize='unicode61')
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS tickets_fts_insert AFTER INSERT ON tickets BEGIN
+        INSERT INTO tickets_fts(rowid, message) VALUES (new.id, new.message);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS tickets_fts_delete AFTER DELETE ON tickets BEGIN
+        INSERT INTO tickets_fts(tickets_fts, rowid, message) VALUES ('delete', old.id, old.message);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS tickets_fts_update AFTER UPDATE OF message ON tickets BEGIN
+        INSERT INTO tickets_fts(tickets_fts, rowid, message) VALUES ('delete', old.id, old.message);
+        INSERT INTO tickets_fts(rowid, message) VALUES (new.id, new.message);
+    END
+    """,
+]
+
+
+async def ensure_user_columns(conn: AsyncConnection) -> None:
+    """Колонки users, добавленные после создания таблицы (create_all их не добавит)"""
+    dialect = conn.dialect.name
+    if dialect == "postgresql":
+        await conn.execute(text(
+            "ALTER TABLE users ADD COLUMN IF NOT EXISTS blocked_bot_at TIMESTAMP WITHOUT TIME ZONE"
+        ))
+    elif dialect == "sqlite":
+        columns = {row[1] for row in await conn.execute(text("PRAGMA table_info(users)"))}
+        if "blocked_bot_at" not in columns:
+            await conn.execute(text("ALTER TABLE users ADD COLUMN blocked_bot_at DATETIME"))
+
+
+async def ensure_user_indexes(conn: AsyncConnection) -> None:
+    """Индексы users, добавленные после создания таблицы"""
+    # Выборка по окну регистрации в bulk_set_role
+    await conn.execute(text("CREATE INDEX IF NOT EXISTS idx_user_created_at ON users (created_at)"))
+
+
+async def ensure_schema(conn: AsyncConnection) -> None:
+    """Дополнения схемы после create_all (идемпотентно)"""
+    await ensure_user_columns(conn)
+    await ensure_user_indexes(conn)
+    await ensure_ticket_search(conn)
+
+
+async def ensure_ticket_search(conn: AsyncConnection) -> None:
+    """
+    Полнотекстовый поиск по тикетам:
+    - Postgres: генерируемая колонка tsvector + GIN-индекс
+    - SQLite (тесты): внешняя FTS5-таблица, синхронизируемая триггерами
+    Идемпотентно, выполняется при каждом старте после create_all.
+    """
+    dialect = conn.dialect.name
+    if dialect == "postgresql":
+        for statement in PG_TICKET_SEARCH:
+            await conn.execute(text(statement))
+    elif dialect == "sqlite":
+        exists = (await conn.execute(text(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'tickets_fts'"
+        ))).first()
+        for statement in SQLITE_TICKET_SEARCH:
+            await conn.execute(text(statement))
+        if not exists:
+            # Индексируем тикеты, созданные до появления FTS-таблицы
+            await conn.execute(text("INSERT INTO tickets_fts(tickets_fts) VALUES ('rebuild')"))
+    else:
+        logger.warning("Full-text ticket search is not supported for %s", dialect)
@@ -0,0 +1,195 @@
+"""
+Снимок FSM-хранилища между перезапусками.
+
+При штатной остановке (SIGTERM/SIGINT) состояния и данные FSM пишутся
+в бинарный файл, при старте - восстанавливаются до начала обработки апдейтов.
+
+Формат файла:
+    заголовок: magic(4) | version(u8) | created_at(f64) | count(u32)
+    запись:    touched_at(f64) | length(u32) | pickle((key, state, data))
+Записи идут от новых к старым - при чтении можно остановиться
+на первой устаревшей, при записи - на лимите размера.
+"""
+from dataclasses import astuple
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+from aiogram import Dispatcher
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import StateType, StorageKey
+from aiogram.fsm.storage.memory import MemoryStorage, MemoryStorageRecord
+import asyncio
+import logging
+import mmap
+import os
+import pickle
+import struct
+import time
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"FSMS"
+VERSION = 1
+HEADER = struct.Struct("<4sBdI")
+ENTRY = struct.Struct("<dI")
+
+
+class SnapshotMemoryStorage(MemoryStorage):
+    """MemoryStorage с временем последнего изменения каждой записи"""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.touched: Dict[StorageKey, float] = {}
+
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        await super().set_state(key, state)
+        self.touched[key] = time.time()
+
+    async def set_data(self, key: StorageKey, data: Dict[str, Any]) -> None:
+        await super().set_data(key, data)
+        self.touched[key] = time.time()
+
+
+def _dump_entries(
+    storage: SnapshotMemoryStorage,
+    max_age: float,
+    max_bytes: int
+) -> List[Tuple[float, bytes]]:
+    """Сериализация записей (новые первыми) в пределах лимита размера"""
+    now = time.time()
+    records = sorted(
+        (
+            (storage.touched.get(key, now), key, record)
+            for key, record in storage.storage.items()
+            # get_state/get_data создают пустые записи - их не сохраняем
+            if record.state is not None or record.data
+        ),
+        key=lambda item: item[0],
+        reverse=True
+    )
+
+    entries = []
+    size = HEADER.size
+    for touched_at, key, record in records:
+        if now - touched_at > max_age:
+            break
+        try:
+            payload = pickle.dumps(
+                (astuple(key), record.state, record.data),
+                protocol=pickle.HIGHEST_PROTOCOL
+            )
+        except Exception as e:
+            logger.warning("FSM record for user %s is not serializable: %s", key.user_id, e)
+            continue
+        size += ENTRY.size + len(payload)
+        if size > max_bytes:
+            logger.warning(
+                "FSM snapshot limit %s bytes reached, %s older records dropped",
+                max_bytes, len(records) - len(entries)
+            )
+            break
+        entries.append((touched_at, payload))
+    return entries
+
+
+def _write_file(path: Path, entries: List[Tuple[float, bytes]]) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix(path.suffix + ".tmp")
+    with open(tmp_path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, VERSION, time.time(), len(entries)))
+        for touched_at, payload in entries:
+            f.write(ENTRY.pack(touched_at, len(payload)))
+            f.write(payload)
+    os.replace(tmp_path, path)
+
+
+def _read_file(
+    path: Path,
+    storage: SnapshotMemoryStorage,
+    max_age: float
+) -> int:
+    """Чтение снимка через mmap, возвращает число восстановленных записей"""
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size < HEADER.size:
+            raise ValueError("truncated header")
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm, memoryview(mm) as view:
+            magic, version, _, count = HEADER.unpack_from(view, 0)
+            if magic != MAGIC or version != VERSION:
+                raise ValueError(f"unsupported snapshot format {magic!r} v{version}")
+
+            now = time.time()
+            offset = HEADER.size
+            restored = 0
+            for _ in range(count):
+                touched_at, length = ENTRY.unpack_from(view, offset)
+                offset += ENTRY.size
+                if now - touched_at > max_age:
+                    # Дальше только более старые записи
+                    break
+                key_fields, state, data = pickle.loads(view[offset:offset + length])
+                offset += length
+
+                key = StorageKey(*key_fields)
+                storage.storage[key] = MemoryStorageRecord(data=data, state=state)
+                storage.touched[key] = touched_at
+                restored += 1
+            return restored
+
+
+async def save_snapshot(
+    storage: SnapshotMemoryStorage,
+    path: Path,
+    max_age: float,
+    max_bytes: int
+) -> int:
+    entries = _dump_entries(storage, max_age, max_bytes)
+    await asyncio.to_thread(_write_file, path, entries)
+    logger.info("FSM snapshot saved: %s records -> %s", len(entries), path)
+    return len(entries)
+
+
+async def load_snapshot(
+    storage: SnapshotMemoryStorage,
+    path: Path,
+    max_age: float
+) -> int:
+    if not path.exists():
+        return 0
+    try:
+        restored = await asyncio.to_thread(_read_file, path, storage, max_age)
+        logger.info("FSM snapshot restored: %s records from %s", restored, path)
+    except Exception as e:
+        restored = 0
+        logger.error("Failed to restore FSM snapshot %s: %s", path, e, exc_info=True)
+    # Снимок одноразовый: после аварийной остановки старые состояния не вернутся
+    path.unlink(missing_ok=True)
+    return restored
+
+
+def setup_fsm_snapshot(
+    dp: Dispatcher,
+    path: str,
+    max_age: float,
+    max_bytes: int
+) -> None:
+    """Восстановление при старте диспетчера и сохранение при остановке"""
+    storage = dp.fsm.storage
+    if not isinstance(storage, SnapshotMemoryStorage):
+        raise TypeError("FSM snapshot requires SnapshotMemoryStorage")
+
+    def snapshot_path(worker_index: Optional[int]) -> Path:
+        # У каждого воркера свой снимок
+        if worker_index is None:
+            return Path(path)
+        return Path(f"{path}.{worker_index}")
+
+    async def restore_fsm(worker_index: Optional[int] = None) -> None:
+        await load_snapshot(storage, snapshot_path(worker_index), max_age)
+
+    async def save_fsm(worker_index: Optional[int] = None) -> None:
+        try:
+            await save_snapshot(storage, snapshot_path(worker_index), max_age, max_bytes)
+        except Exception as e:
+            logger.error("Failed to save FSM snapshot: %s", e, exc_info=True)
+
+    dp.startup.register(restore_fsm)
+    dp.shutdown.register(save_fsm)
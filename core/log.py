@@ -0,0 +1,175 @@
+from contextvars import ContextVar
+from logging.handlers import QueueHandler, QueueListener
+from typing import Dict, Optional
+import copy
+import json
+import logging
+import queue
+import random
+import sys
+
+# Идентификаторы текущего апдейта для корреляции логов
+update_id_var: ContextVar[Optional[int]] = ContextVar("update_id", default=None)
+telegram_id_var: ContextVar[Optional[int]] = ContextVar("telegram_id", default=None)
+
+# Стандартные атрибуты LogRecord - все остальное считается структурными полями
+_RECORD_ATTRS = set(vars(logging.makeLogRecord({}))) | {
+    "message", "asctime", "update_id", "telegram_id"
+}
+
+
+class ContextFilter(logging.Filter):
+    """Добавляет update_id/telegram_id в запись (выполняется в потоке события)"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.update_id = update_id_var.get()
+        record.telegram_id = telegram_id_var.get()
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Пропускает только долю DEBUG-записей.
+    Доля задается по имени логгера и действует на дочерние
+    ("core" -> "core.middleware"), побеждает самый длинный префикс.
+    Записи INFO и выше проходят всегда.
+    Вешается на обработчик: фильтры логгера не видят записи потомков.
+    """
+
+    def __init__(self, rates: Dict[str, float]):
+        super().__init__()
+        self.rates = rates
+        self._resolved: Dict[str, Optional[float]] = {}
+
+    def _rate(self, name: str) -> Optional[float]:
+        if name not in self._resolved:
+            prefix = name
+            while prefix and prefix not in self.rates:
+                prefix = prefix.rpartition(".")[0]
+            self._resolved[name] = self.rates.get(prefix) if prefix else None
+        return self._resolved[name]
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno > logging.DEBUG:
+            return True
+        rate = self._rate(record.name)
+        return rate is None or random.random() < rate
+
+
+class JsonFormatter(logging.Formatter):
+    """Форматирование записи в одну JSON-строку"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        payload = {
+            "ts": round(record.created, 3),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        update_id = getattr(record, "update_id", None)
+        if update_id is not None:
+            payload["update_id"] = update_id
+        telegram_id = getattr(record, "telegram_id", None)
+        if telegram_id is not None:
+            payload["telegram_id"] = telegram_id
+
+        # Поля из extra={...}
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRS and key not in payload:
+                payload[key] = value
+
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            payload["exc"] = record.exc_text
+        return json.dumps(payload, ensure_ascii=False, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    """Текстовый формат с id апдейта и пользователя"""
+
+    def __init__(self):
+        super().__init__("%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+
+    def format(self, record: logging.LogRecord) -> str:
+        line = super().format(record)
+        update_id = getattr(record, "update_id", None)
+        if update_id is not None:
+            line += f" [update_id={update_id} telegram_id={getattr(record, 'telegram_id', None)}]"
+        return line
+
+
+class _QueueHandler(QueueHandler):
+    """
+    Кладет запись в очередь без форматирования.
+    Подставляет аргументы сообщения, трейсбек сохраняет в exc_text,
+    остальное форматирование выполняется в фоновом потоке.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+_listener: Optional[QueueListener] = None
+
+
+def parse_levels(value: str) -> Dict[str, str]:
+    """Разбор строки вида 'logger=LEVEL,other=LEVEL'"""
+    result = {}
+    for item in filter(None, (part.strip() for part in value.split(","))):
+        name, _, level = item.partition("=")
+        result[name.strip()] = level.strip()
+    return result
+
+
+def setup_logging(
+    level: str = "INFO",
+    json_format: bool = True,
+    levels: Optional[Dict[str, str]] = None,
+    sampling: Optional[Dict[str, float]] = None
+) -> None:
+    """
+    Настройка логирования:
+    - обработчики пишут из фонового потока через очередь
+    - JSON-вывод с update_id/telegram_id
+    - уровни и семплирование DEBUG для отдельных логгеров
+    """
+    global _listener
+    if _listener:
+        return
+
+    output = logging.StreamHandler(sys.stdout)
+    output.setFormatter(JsonFormatter() if json_format else TextFormatter())
+
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    handler = _QueueHandler(log_queue)
+    if sampling:
+        handler.addFilter(SamplingFilter(sampling))
+    handler.addFilter(ContextFilter())
+
+    root = logging.getLogger()
+    for old_handler in root.handlers[:]:
+        root.removeHandler(old_handler)
+    root.addHandler(handler)
+    root.setLevel(level.upper())
+
+    for name, logger_level in (levels or {}).items():
+        logging.getLogger(name).setLevel(logger_level.upper())
+
+    _listener = QueueListener(log_queue, output, respect_handler_level=True)
+    _listener.start()
+
+
+def shutdown_logging() -> None:
+    """Дописывает очередь и останавливает фоновый поток"""
+    global _listener
+    if _listener:
+        _listener.stop()
+        _listener = None
+
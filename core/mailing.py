@@ -0,0 +1,164 @@
+from typing import Dict, List, Optional, Tuple
+from aiogram import Bot
+from aiogram.exceptions import TelegramAPIError, TelegramForbiddenError, TelegramRetryAfter
+from sqlalchemy import func, update
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from core.database.crud import (
+    get_mailing_delivery_counts, get_mailing_recipients,
+    insert_mailing_deliveries, mark_users_blocked
+)
+from core.database.model import Mailing
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class DeliveryBuffer:
+    """
+    Буфер результатов доставки.
+    Пишет в БД пачками в фоне: пока одна пачка сохраняется,
+    следующая копится - рассылка не ждет каждую вставку.
+    """
+
+    def __init__(
+        self,
+        session_pool: async_sessionmaker[AsyncSession],
+        mailing_id: int,
+        flush_size: int = 1000
+    ):
+        self.session_pool = session_pool
+        self.mailing_id = mailing_id
+        self.flush_size = flush_size
+        self._rows: List[Tuple[int, int, str, Optional[str]]] = []
+        self._blocked: List[int] = []
+        self._flushing: Optional[asyncio.Task] = None
+        self._in_flight: Tuple[list, list] = ([], [])
+
+    async def add(self, user_id: int, status: str, error: Optional[str] = None) -> None:
+        self._rows.append((self.mailing_id, user_id, status, error))
+        if status == "BLOCKED":
+            self._blocked.append(user_id)
+        if len(self._rows) >= self.flush_size:
+            # Не больше одной записи в полете
+            if self._flushing:
+                # Отмена рассылки не должна прерывать запись уже отправленных
+                await asyncio.shield(self._flushing)
+            self._in_flight = self._take()
+            self._flushing = asyncio.create_task(self._write(*self._in_flight))
+
+    def _take(self) -> Tuple[list, list]:
+        rows, blocked = self._rows, self._blocked
+        self._rows, self._blocked = [], []
+        return rows, blocked
+
+    async def _write(self, rows: list, blocked: list) -> None:
+        try:
+            async with self.session_pool() as session:
+                async with session.begin():
+                    await insert_mailing_deliveries(session, rows)
+                    await mark_users_blocked(session, blocked)
+            logger.debug("Saved %s deliveries of mailing %s", len(rows), self.mailing_id)
+        except Exception as e:
+            # Рассылка продолжается, теряется только учет этой пачки
+            logger.error(
+                "Failed to save %s deliveries of mailing %s: %s",
+                len(rows), self.mailing_id, e, exc_info=True
+            )
+
+    async def flush(self) -> None:
+        if self._flushing:
+            try:
+                await asyncio.shield(self._flushing)
+            except asyncio.CancelledError:
+                if not self._flushing.cancelled():
+                    raise
+                # Фоновая запись отменена (остановка процесса) - пишем ее пачку сами
+                rows, blocked = self._in_flight
+                self._rows[:0] = rows
+                self._blocked[:0] = blocked
+            self._flushing = None
+        if self._rows:
+            await self._write(*self._take())
+
+
+async def send_mailing(
+    bot: Bot,
+    session_pool: async_sessionmaker[AsyncSession],
+    mailing_id: int,
+    retry_failed: bool = False,
+    rate_limit: float = 25.0,
+    batch_size: int = 1000
+) -> Dict[str, int]:
+    """
+    Рассылка с записью результата по каждому получателю.
+    Повторный запуск продолжает с недоставленных,
+    retry_failed - только по неудачным попыткам.
+    Прерванная рассылка остается в статусе PENDING.
+    """
+    async with session_pool() as session:
+        mailing = await session.get(Mailing, mailing_id)
+        if not mailing:
+            raise ValueError(f"Mailing {mailing_id} not found")
+        text = mailing.text
+
+    counters = {"SENT": 0, "FAILED": 0, "BLOCKED": 0}
+    buffer = DeliveryBuffer(session_pool, mailing_id, flush_size=batch_size)
+    interval = 1 / rate_limit
+    after_id = 0
+    completed = False
+
+    try:
+        while True:
+            async with session_pool() as session:
+                recipients = await get_mailing_recipients(
+                    session, mailing_id, after_id, batch_size, retry_failed
+                )
+            if not recipients:
+                break
+            after_id = recipients[-1][0]
+
+            for user_id, telegram_id in recipients:
+                status, error = await _deliver(bot, telegram_id, text)
+                counters[status] += 1
+                await buffer.add(user_id, status, error)
+                await asyncio.sleep(interval)
+        completed = True
+    finally:
+        # Учет уже отправленных сохраняем и при прерывании
+        await buffer.flush()
+        if not completed:
+            logger.warning("Mailing %s interrupted, left PENDING: %s", mailing_id, counters)
+
+    async with session_pool() as session:
+        async with session.begin():
+            # Статус - по всем запускам рассылки, а не только по этому
+            totals = await get_mailing_delivery_counts(session, mailing_id)
+            await session.execute(
+                update(Mailing)
+                .where(Mailing.id == mailing_id)
+                .values(
+                    status="FAILED" if totals["FAILED"] and not totals["SENT"] else "SENT",
+                    # Время первого завершения не перезаписываем
+                    sent_at=func.coalesce(Mailing.sent_at, func.now())
+                )
+            )
+    logger.info("Mailing %s finished: %s", mailing_id, counters)
+
+    return counters
+
+
+async def _deliver(bot: Bot, telegram_id: int, text: str) -> Tuple[str, Optional[str]]:
+    """Отправка одного сообщения -> (status, error)"""
+    for _ in range(2):
+        try:
+            await bot.send_message(telegram_id, text)
+            return "SENT", None
+        except TelegramRetryAfter as e:
+            await asyncio.sleep(e.retry_after)
+        except TelegramForbiddenError as e:
+            # Бот заблокирован или пользователь удален
+            return "BLOCKED", str(e)[:255]
+        except TelegramAPIError as e:
+            return "FAILED", str(e)[:255]
+    return "FAILED", "Flood control"
@@ -5,13 +5,9 @@ import sys
 from pathlib import Path
 import logging
 from core.config import Config
+from core.marzban_api.cache import subscription_cache
 import time
 
-# Настройка логирования
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s'
-)
 logger = logging.getLogger(__name__)
 
 class MarzbanAPI:
@@ -23,7 +19,7 @@ class MarzbanAPI:
         self.token = None
         self.token_expiry = 0  # Время истечения токена
         self.token_ttl = 3600  # Время жизни токена в секундах (1 час)
-        logger.info(f"MarzbanAPI initialized for {self.base_url}")
+        logger.info("MarzbanAPI initialized for %s", self.base_url)
 
     def _get_token(self) -> None:
         """Получение и обновление токена авторизации"""
@@ -36,7 +32,7 @@ class MarzbanAPI:
         }
         
         try:
-            logger.debug(f"Requesting token from {endpoint}")
+            logger.debug("Requesting token from %s", endpoint)
             response = requests.post(endpoint, data=data, auth=auth)
             response.raise_for_status()
             
@@ -48,7 +44,7 @@ class MarzbanAPI:
             self.token_expiry = time.time() + self.token_ttl
             logger.info("Successfully obtained access token")
         except requests.exceptions.RequestException as e:
-            logger.error(f"Token request failed: {str(e)}")
+            logger.error("Token request failed: %s", e)
             raise ConnectionError(f"Could not connect to Marzban API: {str(e)}")
 
     def _is_token_valid(self) -> bool:
@@ -67,7 +63,7 @@ class MarzbanAPI:
         }
         
         url = f"{self.base_url}{endpoint}"
-        logger.debug(f"Making {method} request to {url}")
+        logger.debug("Making %s request to %s", method, url)
         
         try:
             response = requests.request(
@@ -78,8 +74,14 @@ class MarzbanAPI:
                 **kwargs
             )
             
-            logger.debug(f"Response status: {response.status_code}")
-            logger.debug(f"Response content: {response.text[:200]}...")
+            # Тело ответа декодируется только при включенном DEBUG
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug(
+                    "Response %s: %.200s",
+                    response.status_code,
+                    response.text,
+                    extra={"method": method, "endpoint": endpoint}
+                )
             
             response.raise_for_status()
             return response.json()
@@ -109,7 +111,7 @@ class MarzbanAPI:
                 logger.error(error_msg)
                 raise Exception(error_msg)
         except requests.exceptions.RequestException as e:
-            logger.error(f"Request failed: {str(e)}")
+            logger.error("Request failed: %s", e)
             raise ConnectionError(f"API request failed: {str(e)}")
 
     # Остальные методы остаются без изменений
@@ -141,24 +143,50 @@ class MarzbanAPI:
             return self._make_request("GET", endpoint)
         except Exception as e:
             if "404" in str(e):
-                logger.warning(f"User {username} not found")
+                logger.warning("User %s not found", username)
                 return None
             raise
 
+    def get_subscription(self, username: str) -> Optional[Dict[str, Any]]:
+        """Ссылка подписки и конфиги пользователя (с кешированием)"""
+        cached = subscription_cache.get(username)
+        if cached is not None:
+            return cached
+
+        user = self.get_user(username)
+        if user is None:
+            return None
+
+        subscription_url = user.get("subscription_url") or ""
+        # Панель без XRAY_SUBSCRIPTION_URL_PREFIX отдает относительный путь
+        if subscription_url.startswith("/"):
+            subscription_url = f"{self.base_url}{subscription_url}"
+
+        subscription = {
+            "subscription_url": subscription_url,
+            "links": user.get("links", []),
+        }
+        subscription_cache.set(username, subscription)
+        return subscription
+
     def update_user(self, username: str, user_data: Dict[str, Any]) -> Dict[str, Any]:
         """Обновление данных пользователя"""
         endpoint = f"/api/user/{username}"
-        return self._make_request("PUT", endpoint, json=user_data)
+        try:
+            return self._make_request("PUT", endpoint, json=user_data)
+        finally:
+            subscription_cache.invalidate(username)
 
     def delete_user(self, username: str) -> bool:
         """Удаление пользователя"""
         endpoint = f"/api/user/{username}"
         try:
             self._make_request("DELETE", endpoint)
-            logger.info(f"User {username} deleted successfully")
+            subscription_cache.invalidate(username)
+            logger.info("User %s deleted successfully", username)
             return True
         except Exception as e:
-            logger.error(f"Failed to delete user {username}: {str(e)}")
+            logger.error("Failed to delete user %s: %s", username, e)
             return False
 
     def get_users(self, status: Optional[str] = None, offset: int = 0, limit: int = 100) -> List[Dict[str, Any]]:
@@ -178,7 +206,11 @@ class MarzbanAPI:
     def revoke_user_subscription(self, username: str) -> Dict[str, Any]:
         """Отзыв подписки пользователя"""
         endpoint = f"/api/user/{username}/revoke_sub"
-        return self._make_request("POST", endpoint)
+        try:
+            return self._make_request("POST", endpoint)
+        finally:
+            # Старая ссылка больше недействительна
+            subscription_cache.invalidate(username)
 
     def reset_user_traffic(self, username: str) -> Dict[str, Any]:
         """Сброс трафика пользователя"""
@@ -193,7 +225,9 @@ class MarzbanAPI:
     def get_all_nodes(self) -> List[Dict[str, Any]]:
         """Получение списка всех узлов"""
         endpoint = "/api/nodes"
-        return self._make_request("GET", endpoint).get("nodes", [])
+        nodes = self._make_request("GET", endpoint)
+        # Панель отдает список узлов (на всякий случай принимаем и {"nodes": [...]})
+        return nodes.get("nodes", []) if isinstance(nodes, dict) else nodes
 
     def get_node(self, node_id: int) -> Dict[str, Any]:
         """Получение информации об узле"""
@@ -0,0 +1,45 @@
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+from core.config import Config
+import threading
+import time
+
+
+class SubscriptionCache:
+    """
+    Кеш ссылок подписки по marzban_username.
+    Записи живут ttl секунд, сбрасываются при отзыве подписки.
+    Используется и из потоков клиента MarzbanAPI, поэтому под блокировкой.
+    """
+
+    def __init__(self, ttl: float = 600, max_size: int = 10000):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._items: "OrderedDict[str, tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, username: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            item = self._items.get(username)
+            if item is None:
+                return None
+            stored_at, value = item
+            if time.monotonic() - stored_at > self.ttl:
+                del self._items[username]
+                return None
+            self._items.move_to_end(username)
+            return value
+
+    def set(self, username: str, value: Dict[str, Any]) -> None:
+        with self._lock:
+            self._items[username] = (time.monotonic(), value)
+            self._items.move_to_end(username)
+            while len(self._items) > self.max_size:
+                self._items.popitem(last=False)
+
+    def invalidate(self, username: str) -> None:
+        with self._lock:
+            self._items.pop(username, None)
+
+
+subscription_cache = SubscriptionCache(ttl=Config.SUBSCRIPTION_CACHE_TTL)
@@ -1,17 +1,28 @@
-from typing import Callable, Dict, Awaitable, Any, Union
+from typing import Callable, Dict, Awaitable, Any, Union, Optional
 from aiogram import BaseMiddleware
 from aiogram.types import TelegramObject, Message, CallbackQuery, Update
 from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
 from core.database.crud import get_user_by_telegram_id, create_user
 from core.database.model import User
+from core.database.routing import SessionRouter
+from core.username_sync import UsernameSync
+from core.log import update_id_var, telegram_id_var
+from core.database.instrumentation import track_queries
 import logging
 
 logger = logging.getLogger(__name__)
 
 class RoleMiddleware(BaseMiddleware):
-    def __init__(self, session_pool: async_sessionmaker[AsyncSession]):
+    def __init__(
+        self,
+        session_pool: async_sessionmaker[AsyncSession],
+        session_router: Optional[SessionRouter] = None,
+        username_sync: Optional[UsernameSync] = None
+    ):
         super().__init__()
         self.session_pool = session_pool
+        self.session_router = session_router
+        self.username_sync = username_sync
 
     async def __call__(
         self,
@@ -19,7 +30,8 @@ class RoleMiddleware(BaseMiddleware):
         event: TelegramObject,
         data: Dict[str, Any]
     ) -> Any:
-        logger.debug(f"RoleMiddleware called for event: {event}")
+        if isinstance(event, Update):
+            update_id_var.set(event.update_id)
         data.update({"user": None, "role": "USER"})
 
         # Извлекаем конкретное событие из Update
@@ -29,43 +41,102 @@ class RoleMiddleware(BaseMiddleware):
             elif event.callback_query:
                 actual_event = event.callback_query
             else:
-                logger.debug(f"Skipping middleware: unsupported event type in Update: {event}")
+                logger.debug("Skipping middleware: unsupported update type %s", event.event_type)
                 return await handler(event, data)
         else:
             actual_event = event
 
         # Проверяем, что событие — Message или CallbackQuery и есть from_user
         if not isinstance(actual_event, (Message, CallbackQuery)) or not actual_event.from_user:
-            logger.warning(f"Skipping middleware: event={actual_event}, from_user={getattr(actual_event, 'from_user', None)}")
+            logger.warning("Skipping middleware: event without from_user (%s)", type(actual_event).__name__)
             return await handler(event, data)
 
         user = actual_event.from_user
         telegram_id = user.id
-        logger.debug(f"Processing user: telegram_id={telegram_id}")
+        telegram_id_var.set(telegram_id)
 
         try:
             async with self.session_pool() as session:
                 async with session.begin():
                     db_user = await get_user_by_telegram_id(session, telegram_id)
-                    logger.debug(f"Found user: {db_user}")
                     
                     if not db_user:
                         db_user = await create_user(session, telegram_id, user.username)
-                        logger.debug(f"Created user: {db_user}")
                         if db_user:
                             await session.commit()
+                            if self.username_sync:
+                                self.username_sync.remember(telegram_id, user.username)
+                            # Следующие чтения этого пользователя - с основной БД
+                            if self.session_router:
+                                self.session_router.mark_write(telegram_id)
                         else:
-                            logger.error(f"Failed to create user for telegram_id {telegram_id}")
+                            logger.error("Failed to create user for telegram_id %s", telegram_id)
                             await session.rollback()
+                    else:
+                        if db_user.blocked_bot_at is not None:
+                            # Пользователь снова пишет боту - возвращаем его в рассылки
+                            db_user.blocked_bot_at = None
+                            if self.session_router:
+                                self.session_router.mark_write(telegram_id)
+                        if self.username_sync:
+                            # Смена username пишется в БД пачкой в фоне, не здесь
+                            self.username_sync.observe(telegram_id, user.username, db_user.username)
 
                     data.update({
                         "user": db_user,
                         "role": db_user.role.upper() if db_user else "USER"
                     })
-                    logger.debug(f"Updated data: user={db_user}, role={data['role']}")
+                    if logger.isEnabledFor(logging.DEBUG):
+                        logger.debug("Resolved role", extra={"role": data["role"]})
 
         except Exception as e:
-            logger.error(f"Middleware error for telegram_id {telegram_id}: {str(e)}", exc_info=True)
+            logger.error("Middleware error for telegram_id %s: %s", telegram_id, e, exc_info=True)
             data.update({"user": None, "role": "USER"})
 
         return await handler(event, data)
+
+
+class QueryBudgetMiddleware(BaseMiddleware):
+    """
+    Считает SQL-запросы, строки и время БД на каждый апдейт.
+    Счетчики доступны хендлерам как query_stats,
+    превышение бюджета пишется в лог.
+    """
+
+    def __init__(self, max_statements: int, max_db_ms: float):
+        super().__init__()
+        self.max_statements = max_statements
+        self.max_db_ms = max_db_ms
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any]
+    ) -> Any:
+        with track_queries() as stats:
+            data["query_stats"] = stats
+            try:
+                return await handler(event, data)
+            finally:
+                if stats.statements > self.max_statements or stats.db_ms > self.max_db_ms:
+                    logger.warning(
+                        "SQL budget exceeded for %s: %s statements, %s ms",
+                        self._route(event), stats.statements, stats.db_ms,
+                        extra={
+                            "sql_statements": stats.statements,
+                            "sql_rows": stats.rows,
+                            "sql_ms": stats.db_ms,
+                        }
+                    )
+
+    @staticmethod
+    def _route(event: TelegramObject) -> str:
+        """Чем был вызван хендлер: callback data или команда"""
+        if isinstance(event, Update):
+            if event.callback_query:
+                return f"callback {event.callback_query.data}"
+            if event.message and event.message.text and event.message.text.startswith("/"):
+                return f"command {event.message.text.split()[0]}"
+            return event.event_type
+        return type(event).__name__
@@ -0,0 +1,94 @@
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, Optional
+from core.config import Config
+import asyncio
+import hashlib
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+
+def content_hash(data: str) -> str:
+    return hashlib.sha256(data.encode()).hexdigest()
+
+
+def _render_png(data: str, path: Path) -> None:
+    """Рендер QR-кода (выполняется в пуле потоков)"""
+    import qrcode
+
+    image = qrcode.make(data, box_size=8, border=2)
+    tmp_path = path.with_suffix(".tmp")
+    image.save(tmp_path, format="PNG")
+    os.replace(tmp_path, path)
+
+
+def _read_file_id(path: Path) -> Optional[str]:
+    try:
+        return path.read_text().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+class QRCache:
+    """
+    QR-коды в PNG с кешем на диске по хешу содержимого.
+    Рендер и файловые операции - в пуле потоков, цикл событий не блокируется.
+    Запоминает file_id загруженных в Telegram картинок, чтобы не загружать повторно.
+    """
+
+    def __init__(self, directory: str, max_workers: int = 2):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="qr")
+        self._file_ids: Dict[str, str] = {}
+        self._rendering: Dict[str, asyncio.Future] = {}
+
+    async def _run(self, func, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
+
+    async def get_png(self, data: str) -> Path:
+        """Путь к PNG с QR-кодом, рендерит при отсутствии"""
+        digest = content_hash(data)
+        path = self.directory / f"{digest}.png"
+
+        # Одинаковые одновременные запросы ждут один рендер
+        pending = self._rendering.get(digest)
+        if pending:
+            await pending
+            return path
+
+        future = asyncio.get_running_loop().create_future()
+        self._rendering[digest] = future
+        try:
+            if not await self._run(path.exists):
+                await self._run(_render_png, data, path)
+                logger.debug("QR rendered: %s", digest)
+            future.set_result(None)
+        except Exception as e:
+            future.set_exception(e)
+            # Ошибку получат ожидающие; помечаем ее прочитанной, если их нет
+            future.exception()
+            raise
+        finally:
+            del self._rendering[digest]
+        return path
+
+    async def get_file_id(self, data: str) -> Optional[str]:
+        """file_id ранее загруженного QR-кода"""
+        digest = content_hash(data)
+        file_id = self._file_ids.get(digest)
+        if file_id is None:
+            file_id = await self._run(_read_file_id, self.directory / f"{digest}.file_id")
+            if file_id:
+                self._file_ids[digest] = file_id
+        return file_id
+
+    async def remember_file_id(self, data: str, file_id: str) -> None:
+        digest = content_hash(data)
+        self._file_ids[digest] = file_id
+        await self._run((self.directory / f"{digest}.file_id").write_text, file_id)
+
+
+qr_cache = QRCache(Config.QR_CACHE_DIR)
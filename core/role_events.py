@@ -0,0 +1,46 @@
+"""
+Оповещение о массовой смене ролей.
+
+Подписчики вызываются только в текущем процессе. При WORKERS > 1 событие
+получат лишь подписчики воркера, выполнившего смену роли, - кеши ролей
+в других воркерах так не сбросить: нужен общий канал (например, через
+БД или Redis) или кеш с коротким TTL.
+"""
+from typing import Any, Awaitable, Callable, List, Sequence, Union
+import inspect
+import logging
+
+logger = logging.getLogger(__name__)
+
+# listener(telegram_ids, role) - синхронный или async
+RoleListener = Callable[[Sequence[int], str], Union[Awaitable[Any], Any]]
+
+_listeners: List[RoleListener] = []
+
+
+def subscribe(listener: RoleListener) -> RoleListener:
+    """
+    Подписка на массовую смену ролей.
+    Компоненты с закешированными ролями сбрасывают в ней кеш для telegram_ids.
+    Можно использовать как декоратор.
+    """
+    _listeners.append(listener)
+    return listener
+
+
+def unsubscribe(listener: RoleListener) -> None:
+    if listener in _listeners:
+        _listeners.remove(listener)
+
+
+async def publish(telegram_ids: Sequence[int], role: str) -> None:
+    """Оповещение подписчиков этого процесса (вызывать после commit)"""
+    if not telegram_ids:
+        return
+    for listener in list(_listeners):
+        try:
+            result = listener(telegram_ids, role)
+            if inspect.isawaitable(result):
+                await result
+        except Exception as e:
+            logger.error("Role listener %r failed: %s", listener, e, exc_info=True)
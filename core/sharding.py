@@ -0,0 +1,301 @@
+"""
+Многопроцессная обработка апдейтов.
+
+Процесс-приемник получает апдейты через getUpdates и раскладывает их
+по очередям воркеров по telegram_id - апдейты одного пользователя всегда
+попадают в один процесс и обрабатываются по порядку. Каждый воркер -
+отдельный процесс (spawn) со своим диспетчером и пулом соединений к БД.
+Супервизор перезапускает упавшие воркеры.
+"""
+from typing import Any, Callable, Dict, List, Optional, Set
+from aiogram import Bot, Dispatcher
+from core.config import Config
+import aiohttp
+import asyncio
+import logging
+import multiprocessing as mp
+import queue
+import signal
+import time
+
+logger = logging.getLogger(__name__)
+
+# Long polling: сколько секунд Telegram держит запрос
+POLL_TIMEOUT = 30
+
+
+def partition_key(update: Dict[str, Any]) -> int:
+    """telegram_id автора апдейта (или чата), иначе update_id"""
+    for payload in update.values():
+        if not isinstance(payload, dict):
+            continue
+        user = payload.get("from") or payload.get("user")
+        if isinstance(user, dict) and "id" in user:
+            return user["id"]
+        chat = payload.get("chat")
+        if isinstance(chat, dict) and "id" in chat:
+            return chat["id"]
+    return update.get("update_id", 0)
+
+
+# --- Воркер ---
+
+async def _run_worker(
+    index: int,
+    updates: mp.Queue,
+    token: str,
+    factory: Callable[[], Dispatcher]
+) -> None:
+    bot = Bot(token=token)
+    dp = factory()
+    # Доступен хукам startup/shutdown (например, для отдельного снимка FSM)
+    dp["worker_index"] = index
+    loop = asyncio.get_running_loop()
+    parent = mp.parent_process()
+    # Не больше max_in_flight апдейтов в работе: остальные ждут в ограниченной mp.Queue
+    # (обратное давление на приемник) и не теряются из памяти при падении воркера
+    in_flight = asyncio.Semaphore(Config.WORKER_MAX_IN_FLIGHT)
+
+    # Апдейты одного пользователя выполняются строго по очереди
+    locks: Dict[int, asyncio.Lock] = {}
+    pending: Dict[int, int] = {}
+    tasks: Set[asyncio.Task] = set()
+
+    async def process(key: int, update: Dict[str, Any]) -> None:
+        lock = locks.setdefault(key, asyncio.Lock())
+        pending[key] = pending.get(key, 0) + 1
+        try:
+            async with lock:
+                await dp.feed_raw_update(bot, update)
+        except Exception as e:
+            logger.error("Worker %s failed to process update: %s", index, e, exc_info=True)
+        finally:
+            pending[key] -= 1
+            if not pending[key]:
+                del pending[key]
+                del locks[key]
+
+    await dp.emit_startup(bot=bot, dispatcher=dp, bots=[bot], **dp.workflow_data)
+    logger.info("Worker %s started", index)
+
+    try:
+        # Очередь читается до сигнала остановки от приемника (None):
+        # все апдейты в ней уже подтверждены в Telegram и не придут повторно
+        while True:
+            await in_flight.acquire()
+            try:
+                update = await loop.run_in_executor(None, updates.get, True, 1.0)
+            except queue.Empty:
+                in_flight.release()
+                if parent is not None and not parent.is_alive():
+                    logger.error("Worker %s: ingress process is gone, stopping", index)
+                    break
+                continue
+            if update is None:
+                in_flight.release()
+                break
+            # Задачи создаются в порядке получения, asyncio.Lock отдает их в том же порядке
+            task = asyncio.create_task(process(partition_key(update), update))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+            task.add_done_callback(lambda _: in_flight.release())
+
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+    finally:
+        await dp.emit_shutdown(bot=bot, dispatcher=dp, bots=[bot], **dp.workflow_data)
+        await bot.session.close()
+        logger.info("Worker %s stopped", index)
+
+
+def worker_main(
+    index: int,
+    updates: mp.Queue,
+    token: str,
+    factory: Callable[[], Dispatcher]
+) -> None:
+    """Точка входа процесса-воркера"""
+    # SIGINT/SIGTERM может получить вся группа процессов (Ctrl+C, systemd, docker stop) -
+    # воркеры останавливает приемник, когда раздаст все апдейты
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, signal.SIG_IGN)
+    asyncio.run(_run_worker(index, updates, token, factory))
+
+
+# --- Супервизор ---
+
+class Supervisor:
+    """Запуск воркеров и перезапуск упавших"""
+
+    def __init__(
+        self,
+        token: str,
+        factory: Callable[[], Dispatcher],
+        workers: int,
+        queue_size: int
+    ):
+        self.ctx = mp.get_context("spawn")
+        self.token = token
+        self.factory = factory
+        self.queues: List[mp.Queue] = [self.ctx.Queue(maxsize=queue_size) for _ in range(workers)]
+        self.processes: List[Optional[mp.Process]] = [None] * workers
+        self.started_at: List[float] = [0.0] * workers
+        self.failures: List[int] = [0] * workers
+        self.restart_at: List[float] = [0.0] * workers
+        self.stopping = False
+
+    def _start(self, index: int) -> None:
+        process = self.ctx.Process(
+            target=worker_main,
+            args=(index, self.queues[index], self.token, self.factory),
+            name=f"bot-worker-{index}",
+            daemon=False
+        )
+        process.start()
+        self.processes[index] = process
+        self.started_at[index] = time.monotonic()
+        logger.info("Worker %s started (pid=%s)", index, process.pid)
+
+    def start(self) -> None:
+        for index in range(len(self.queues)):
+            self._start(index)
+
+    async def watch(self, interval: float = 1.0) -> None:
+        """Проверка воркеров, перезапуск с нарастающей задержкой при падениях подряд"""
+        while not self.stopping:
+            await asyncio.sleep(interval)
+            now = time.monotonic()
+            for index, process in enumerate(self.processes):
+                if self.stopping or process is None or process.is_alive():
+                    continue
+                if not self.restart_at[index]:
+                    uptime = now - self.started_at[index]
+                    self.failures[index] = self.failures[index] + 1 if uptime < 10 else 1
+                    delay = min(2 ** (self.failures[index] - 1), 30)
+                    self.restart_at[index] = now + delay
+                    logger.error(
+                        "Worker %s exited with code %s, restarting in %s s",
+                        index, process.exitcode, delay
+                    )
+                if now >= self.restart_at[index]:
+                    self.restart_at[index] = 0.0
+                    self._start(index)
+
+    async def dispatch(self, update: Dict[str, Any]) -> None:
+        updates = self.queues[partition_key(update) % len(self.queues)]
+        try:
+            updates.put_nowait(update)
+        except queue.Full:
+            # Воркер не успевает - ждем место, не блокируя цикл событий
+            await asyncio.to_thread(updates.put, update)
+
+    async def stop(self, timeout: float) -> None:
+        """Воркеры дорабатывают очереди и завершаются"""
+        self.stopping = True
+        for index, updates in enumerate(self.queues):
+            process = self.processes[index]
+            if process is None or not process.is_alive():
+                # Упавший воркер уже не перезапустится - его очередь некому читать
+                logger.warning("Worker %s is not running, its queued updates are dropped", index)
+                continue
+            try:
+                await asyncio.to_thread(updates.put, None, True, timeout)
+            except queue.Full:
+                logger.warning("Worker %s queue is still full after %s s", index, timeout)
+        for index, process in enumerate(self.processes):
+            if process is None or not process.is_alive():
+                continue
+            await asyncio.to_thread(process.join, timeout)
+            if process.is_alive():
+                # SIGTERM воркер игнорирует
+                logger.warning("Worker %s did not stop in %s s, killing", index, timeout)
+                process.kill()
+                await asyncio.to_thread(process.join, 5)
+
+
+# --- Приемник ---
+
+async def _get_updates(
+    http: aiohttp.ClientSession,
+    token: str,
+    offset: Optional[int],
+    allowed_updates: List[str],
+    poll_timeout: int = POLL_TIMEOUT
+) -> List[Dict[str, Any]]:
+    params: Dict[str, Any] = {
+        "timeout": poll_timeout,
+        "allowed_updates": allowed_updates,
+    }
+    if offset is not None:
+        params["offset"] = offset
+    async with http.post(f"https://api.telegram.org/bot{token}/getUpdates", json=params) as response:
+        payload = await response.json()
+    if not payload.get("ok"):
+        raise RuntimeError(f"getUpdates failed: {payload.get('description')}")
+    return payload["result"]
+
+
+async def run_sharded(
+    token: str,
+    workers: int,
+    factory: Callable[[], Dispatcher],
+    queue_size: int = Config.WORKER_QUEUE_SIZE,
+    shutdown_timeout: float = Config.WORKER_SHUTDOWN_TIMEOUT
+) -> None:
+    """Прием апдейтов и раздача воркерам до SIGINT/SIGTERM"""
+    allowed_updates = factory().resolve_used_update_types()
+
+    supervisor = Supervisor(token, factory, workers, queue_size)
+    supervisor.start()
+    watcher = asyncio.create_task(supervisor.watch())
+
+    loop = asyncio.get_running_loop()
+    stopping = asyncio.Event()
+
+    def on_signal() -> None:
+        # Сразу: воркер, вышедший до stop(), не должен перезапускаться
+        supervisor.stopping = True
+        stopping.set()
+
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, on_signal)
+    stop_wait = asyncio.create_task(stopping.wait())
+
+    logger.info("Бот запущен: %s воркеров", workers)
+    offset: Optional[int] = None
+    backoff = 1.0
+    timeout = aiohttp.ClientTimeout(total=POLL_TIMEOUT + 10)
+
+    try:
+        async with aiohttp.ClientSession(timeout=timeout) as http:
+            while not stopping.is_set():
+                poll = asyncio.create_task(_get_updates(http, token, offset, allowed_updates))
+                await asyncio.wait({poll, stop_wait}, return_when=asyncio.FIRST_COMPLETED)
+                if not poll.done():
+                    poll.cancel()
+                    break
+
+                try:
+                    updates = poll.result()
+                except Exception as e:
+                    logger.error("Ошибка получения апдейтов: %s, повтор через %s с", e, backoff)
+                    await asyncio.sleep(backoff)
+                    backoff = min(backoff * 2, 30)
+                    continue
+                backoff = 1.0
+
+                for update in updates:
+                    await supervisor.dispatch(update)
+                    offset = update["update_id"] + 1
+
+            # Подтверждаем уже розданные апдейты, чтобы не получить их повторно
+            if offset is not None:
+                try:
+                    await _get_updates(http, token, offset, allowed_updates, poll_timeout=0)
+                except Exception as e:
+                    logger.warning("Не удалось подтвердить offset %s: %s", offset, e)
+    finally:
+        watcher.cancel()
+        stop_wait.cancel()
+        await supervisor.stop(shutdown_timeout)
+        logger.info("Все воркеры остановлены")
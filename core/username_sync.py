@@ -0,0 +1,175 @@
+"""
+Фоновое обновление username пользователей.
+
+Middleware сообщает username из каждого апдейта, в очередь попадают
+только реальные изменения - сравнение с последним известным значением
+в памяти. Очередь периодически сбрасывается в БД одним
+UPDATE ... FROM (VALUES ...) на пачку, без записи в горячем пути.
+"""
+from collections import OrderedDict
+from typing import Dict, Optional
+from aiogram import Dispatcher
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from core.database.crud import update_usernames
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+_MISSING = object()
+
+
+class UsernameSync:
+    """Буфер изменений username с периодической записью в БД"""
+
+    def __init__(
+        self,
+        session_pool: async_sessionmaker[AsyncSession],
+        interval: float = 5.0,
+        batch_size: int = 500,
+        max_known: int = 100_000,
+        stats_interval: float = 300.0
+    ):
+        self.session_pool = session_pool
+        self.interval = interval
+        self.stats_interval = stats_interval
+        self.batch_size = batch_size
+        self.max_known = max_known
+        # telegram_id -> последний известный username (LRU)
+        self._known: "OrderedDict[int, Optional[str]]" = OrderedDict()
+        # telegram_id -> username, ожидающий записи
+        self._pending: Dict[int, Optional[str]] = {}
+        self._task: Optional[asyncio.Task] = None
+        self._lock = asyncio.Lock()
+
+        # Метрики
+        self.observed = 0
+        self.queued = 0
+        self.flushed = 0
+        self.failed = 0
+
+    def _remember(self, telegram_id: int, username: Optional[str]) -> None:
+        self._known[telegram_id] = username
+        self._known.move_to_end(telegram_id)
+        if len(self._known) > self.max_known:
+            self._known.popitem(last=False)
+
+    def remember(self, telegram_id: int, username: Optional[str]) -> None:
+        """Актуальное значение уже в БД (например, пользователь только создан)"""
+        self._remember(telegram_id, username)
+
+    def observe(
+        self,
+        telegram_id: int,
+        username: Optional[str],
+        stored: Optional[str] = None
+    ) -> bool:
+        """
+        username из апдейта; stored - значение из БД на случай,
+        если пользователя еще нет в памяти. True - изменение поставлено в очередь.
+        """
+        self.observed += 1
+        known = self._known.get(telegram_id, _MISSING)
+        if known is _MISSING:
+            known = stored
+        self._remember(telegram_id, username)
+        if username == known:
+            return False
+        self._pending[telegram_id] = username
+        self.queued += 1
+        return True
+
+    @property
+    def pending(self) -> int:
+        return len(self._pending)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "pending": self.pending,
+            "known": len(self._known),
+            "observed": self.observed,
+            "queued": self.queued,
+            "flushed": self.flushed,
+            "failed": self.failed,
+        }
+
+    async def flush(self) -> int:
+        """Запись накопленных изменений, возвращает число обновленных строк"""
+        async with self._lock:
+            if not self._pending:
+                return 0
+            changes, self._pending = list(self._pending.items()), {}
+
+            updated = 0
+            for start in range(0, len(changes), self.batch_size):
+                batch = changes[start:start + self.batch_size]
+                try:
+                    async with self.session_pool() as session:
+                        async with session.begin():
+                            updated += await update_usernames(session, batch)
+                    self.flushed += len(batch)
+                except Exception as e:
+                    self.failed += len(batch)
+                    logger.error("Failed to update %s usernames: %s", len(batch), e, exc_info=True)
+                    # Вернем в очередь, если за это время не пришло более новое значение
+                    for telegram_id, username in batch:
+                        self._pending.setdefault(telegram_id, username)
+
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("Usernames flushed", extra=self.stats())
+            return updated
+
+    def _log_stats(self) -> None:
+        stats = self.stats()
+        logger.info(
+            "Username sync: %s pending, %s flushed, %s failed",
+            stats["pending"], stats["flushed"], stats["failed"],
+            extra=stats
+        )
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        reported_at = loop.time()
+        reported_queued = self.queued
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error("Username sync error: %s", e, exc_info=True)
+
+            # Метрики на уровне INFO - раз в stats_interval, если были изменения или очередь не пуста
+            if loop.time() - reported_at >= self.stats_interval:
+                if self.pending or self.queued != reported_queued:
+                    self._log_stats()
+                reported_at = loop.time()
+                reported_queued = self.queued
+
+    def start(self) -> None:
+        if not self._task:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+        self._log_stats()
+
+
+def setup_username_sync(dp: Dispatcher, sync: UsernameSync) -> None:
+    """Запуск фоновой записи при старте диспетчера и финальный сброс при остановке"""
+
+    async def start_username_sync() -> None:
+        sync.start()
+
+    async def stop_username_sync() -> None:
+        await sync.stop()
+
+    dp["username_sync"] = sync
+    dp.startup.register(start_username_sync)
+    dp.shutdown.register(stop_username_sync)
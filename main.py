@@ -4,37 +4,47 @@ import os
 from dotenv import load_dotenv
 
 from aiogram import Bot, Dispatcher
-from aiogram.fsm.storage.memory import MemoryStorage
 from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 
-from core.middleware import RoleMiddleware
+from core.config import Config
+from core.log import setup_logging, shutdown_logging, parse_levels
+from core.middleware import RoleMiddleware, QueryBudgetMiddleware
+from core.fsm_snapshot import SnapshotMemoryStorage, setup_fsm_snapshot
+from core.username_sync import UsernameSync, setup_username_sync
+from core.marzban_api.api import MarzbanAPI
 from core.database.model import Base
-from core.database.database import async_session, engine
+from core.database.schema import ensure_schema
+from core.database.database import async_session, engine, replica_engine, session_router
 
-# Настройка логгера для SQLAlchemy
-logging.basicConfig()
-logging.getLogger('sqlalchemy.engine').setLevel(logging.DEBUG)
 load_dotenv()
 
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+# Логи пишутся из фонового потока (уровни и семплирование - в .env)
+setup_logging(
+    level=Config.LOG_LEVEL,
+    json_format=Config.LOG_FORMAT == "json",
+    levels=parse_levels(Config.LOG_LEVELS),
+    sampling={name: float(rate) for name, rate in parse_levels(Config.LOG_SAMPLING).items()}
 )
 logger = logging.getLogger(__name__)
 
-async def main():
-    # Проверка переменных окружения
-    if not (BOT_TOKEN := os.getenv("BOT_TOKEN")) or not (DATABASE_URL := os.getenv("DATABASE_URL")):
-        logger.error("Требуемые переменные окружения не установлены!")
-        return
+async def close_db():
+    await session_router.close()
+    await engine.dispose()
+    if replica_engine:
+        await replica_engine.dispose()
+    logger.info("Подключения к БД закрыты")
 
-    # Инициализация бота и диспетчера
-    bot = Bot(token=BOT_TOKEN)
-    dp = Dispatcher(storage=MemoryStorage())
-    
-    # Создаем таблицы при старте
-    async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
+def build_dispatcher() -> Dispatcher:
+    """Диспетчер со всеми middleware и роутерами (и в основном процессе, и в воркерах)"""
+    dp = Dispatcher(storage=SnapshotMemoryStorage())
+
+    # FSM переживает перезапуск: снимок при остановке, восстановление при старте
+    setup_fsm_snapshot(
+        dp,
+        path=Config.FSM_SNAPSHOT_PATH,
+        max_age=Config.FSM_SNAPSHOT_MAX_AGE,
+        max_bytes=Config.FSM_SNAPSHOT_MAX_BYTES
+    )
 
     # Инициализация пула сессий
     session_pool = async_sessionmaker(
@@ -43,19 +53,68 @@ async def main():
         class_=AsyncSession
     )
 
-    # Регистрация middleware
-    dp.update.outer_middleware(RoleMiddleware(session_pool=session_pool))
+    # Клиент Marzban доступен в хендлерах как marzban_api
+    dp["marzban_api"] = MarzbanAPI()
+
+    # Регистрация middleware (подсчет SQL - первым, чтобы учесть и поиск роли)
+    dp.update.outer_middleware(QueryBudgetMiddleware(
+        max_statements=Config.SQL_BUDGET_STATEMENTS,
+        max_db_ms=Config.SQL_BUDGET_MS
+    ))
+    # Изменения username копятся в памяти и пишутся пачкой (до close_db при остановке)
+    username_sync = UsernameSync(
+        session_pool,
+        interval=Config.USERNAME_FLUSH_INTERVAL,
+        stats_interval=Config.USERNAME_STATS_INTERVAL
+    )
+    setup_username_sync(dp, username_sync)
+    dp.update.outer_middleware(RoleMiddleware(
+        session_pool=session_pool,
+        session_router=session_router,
+        username_sync=username_sync
+    ))
 
     # Подключение роутеров
     from modules.user.main_menu.router import main_menu_router
     dp.include_router(main_menu_router)
+    from modules.admin.roles.router import roles_router
+    dp.include_router(roles_router)
+    from modules.support.tickets.router import tickets_router
+    dp.include_router(tickets_router)
+    from modules.admin.mailing.router import mailing_router
+    dp.include_router(mailing_router)
+
+    # Хуки роутеров выполняются после хуков диспетчера - рассылки останавливаем здесь, до close_db
+    from modules.admin.mailing.handlers import stop_mailings
+    dp.shutdown.register(stop_mailings)
+    dp.shutdown.register(close_db)
+    return dp
+
+async def main():
+    # Проверка переменных окружения
+    if not (BOT_TOKEN := os.getenv("BOT_TOKEN")) or not (DATABASE_URL := os.getenv("DATABASE_URL")):
+        logger.error("Требуемые переменные окружения не установлены!")
+        return
+
+    # Создаем таблицы при старте
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        await ensure_schema(conn)
 
     try:
-        logger.info("Бот запущен")
-        await dp.start_polling(bot)
+        if Config.WORKERS > 1:
+            # Прием апдейтов здесь, обработка - в процессах-воркерах
+            from core.sharding import run_sharded
+            await engine.dispose()
+            await run_sharded(BOT_TOKEN, Config.WORKERS, build_dispatcher)
+        else:
+            # Инициализация бота и диспетчера
+            bot = Bot(token=BOT_TOKEN)
+            dp = build_dispatcher()
+            logger.info("Бот запущен")
+            await dp.start_polling(bot)
     finally:
-        await engine.dispose()
-        logger.info("Подключения к БД закрыты")
+        shutdown_logging()
 
 if __name__ == "__main__":
     asyncio.run(main())
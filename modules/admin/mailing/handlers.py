@@ -0,0 +1,95 @@
+from aiogram import Bot
+from aiogram.filters import CommandObject
+from aiogram.types import Message
+from core.database.database import async_session
+from core.database.model import Mailing, User
+from core.mailing import send_mailing
+from .texts import (
+    MAILING_USAGE_TEXT, MAILING_STARTED_TEXT, MAILING_RESUME_STARTED_TEXT,
+    MAILING_RETRY_STARTED_TEXT, MAILING_RUNNING_TEXT, MAILING_FINISHED_TEXT,
+    MAILING_ERROR_TEXT, MAILING_RATE_LIMIT
+)
+from typing import Dict, Optional
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Рассылки, выполняемые в этом процессе (ссылки на задачи - чтобы их не собрал GC)
+_active: Dict[int, asyncio.Task] = {}
+
+async def run_mailing(bot: Bot, admin_chat_id: int, mailing_id: int, retry_failed: bool):
+    """Рассылка в фоне с отчетом администратору"""
+    try:
+        counters = await send_mailing(
+            bot,
+            async_session,
+            mailing_id,
+            retry_failed=retry_failed,
+            rate_limit=MAILING_RATE_LIMIT
+        )
+        await bot.send_message(admin_chat_id, MAILING_FINISHED_TEXT.format(id=mailing_id, **counters))
+    except Exception as e:
+        logger.error(f"Ошибка рассылки {mailing_id}: {str(e)}", exc_info=True)
+        await bot.send_message(admin_chat_id, MAILING_ERROR_TEXT.format(id=mailing_id, error=e))
+    finally:
+        _active.pop(mailing_id, None)
+
+async def stop_mailings():
+    """Остановка рассылок при завершении бота (до закрытия БД) - учет доставок сохраняется"""
+    tasks = list(_active.values())
+    for task in tasks:
+        task.cancel()
+    if tasks:
+        await asyncio.gather(*tasks, return_exceptions=True)
+        logger.info("Stopped %s mailings, they can be resumed with /mailing_resume", len(tasks))
+
+def start_mailing(bot: Bot, admin_chat_id: int, mailing_id: int, retry_failed: bool = False) -> bool:
+    """False - рассылка уже выполняется"""
+    if mailing_id in _active:
+        return False
+    task = asyncio.create_task(run_mailing(bot, admin_chat_id, mailing_id, retry_failed))
+    _active[mailing_id] = task
+    return True
+
+def parse_mailing_id(command: CommandObject) -> Optional[int]:
+    if not command.args or not command.args.strip().isdigit():
+        return None
+    return int(command.args)
+
+async def mailing_command(
+    message: Message,
+    command: CommandObject,
+    bot: Bot,
+    user: Optional[User] = None
+):
+    """/mailing <текст>"""
+    if not command.args:
+        return await message.answer(MAILING_USAGE_TEXT)
+
+    async with async_session() as session:
+        async with session.begin():
+            mailing = Mailing(text=command.args, created_by=user.id if user else None)
+            session.add(mailing)
+        mailing_id = mailing.id
+
+    start_mailing(bot, message.chat.id, mailing_id)
+    await message.answer(MAILING_STARTED_TEXT.format(id=mailing_id))
+
+async def mailing_resume_command(message: Message, command: CommandObject, bot: Bot):
+    """/mailing_resume <id> - всем, кому рассылка еще не доставлена"""
+    if (mailing_id := parse_mailing_id(command)) is None:
+        return await message.answer(MAILING_USAGE_TEXT)
+
+    if not start_mailing(bot, message.chat.id, mailing_id):
+        return await message.answer(MAILING_RUNNING_TEXT.format(id=mailing_id))
+    await message.answer(MAILING_RESUME_STARTED_TEXT.format(id=mailing_id))
+
+async def mailing_retry_command(message: Message, command: CommandObject, bot: Bot):
+    """/mailing_retry <id> - только по неудачным попыткам"""
+    if (mailing_id := parse_mailing_id(command)) is None:
+        return await message.answer(MAILING_USAGE_TEXT)
+
+    if not start_mailing(bot, message.chat.id, mailing_id, retry_failed=True):
+        return await message.answer(MAILING_RUNNING_TEXT.format(id=mailing_id))
+    await message.answer(MAILING_RETRY_STARTED_TEXT.format(id=mailing_id))
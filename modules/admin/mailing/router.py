@@ -0,0 +1,11 @@
+from aiogram import Router
+from aiogram.filters import Command
+from .handlers import mailing_command, mailing_resume_command, mailing_retry_command
+from core.filters import IsAdmin
+
+mailing_router = Router()
+mailing_router.message.filter(IsAdmin)
+
+mailing_router.message.register(mailing_command, Command("mailing"))
+mailing_router.message.register(mailing_resume_command, Command("mailing_resume"))
+mailing_router.message.register(mailing_retry_command, Command("mailing_retry"))
@@ -0,0 +1,22 @@
+MAILING_USAGE_TEXT = """
+Использование:
+/mailing <текст> - новая рассылка
+/mailing_resume <id> - продолжить прерванную рассылку
+/mailing_retry <id> - повторить только неудачные отправки
+"""
+
+MAILING_STARTED_TEXT = "📨 Рассылка #{id} запущена"
+MAILING_RESUME_STARTED_TEXT = "📨 Рассылка #{id} продолжена"
+MAILING_RETRY_STARTED_TEXT = "📨 Повтор неудачных отправок рассылки #{id} запущен"
+MAILING_FINISHED_TEXT = """
+📨 Рассылка #{id} завершена
+
+▫️ Доставлено: {SENT}
+▫️ Ошибки: {FAILED}
+▫️ Заблокировали бота: {BLOCKED}
+"""
+MAILING_RUNNING_TEXT = "⏳ Рассылка #{id} уже выполняется"
+MAILING_ERROR_TEXT = "⚠️ Ошибка рассылки #{id}: {error}"
+
+# Сообщений в секунду (лимит Telegram - около 30)
+MAILING_RATE_LIMIT = 25
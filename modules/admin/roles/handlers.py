@@ -0,0 +1,86 @@
+from aiogram.filters import CommandObject
+from aiogram.types import Message
+from core.database.crud import bulk_set_role, ROLES
+from core.database.database import session_router
+from core.database.model import User
+from core import role_events
+from .texts import (
+    SETROLE_USAGE_TEXT, SETROLE_DONE_TEXT, SETROLE_NOTHING_TEXT, SETROLE_ERROR_TEXT
+)
+from datetime import datetime
+from typing import Any, Dict, Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+def parse_selection(args: str) -> Dict[str, Any]:
+    """Разбор условий: telegram_id, name:<шаблон>, from:<дата>, to:<дата>"""
+    selection: Dict[str, Any] = {}
+    telegram_ids = []
+    for token in args.split():
+        key, sep, value = token.partition(":")
+        if not sep:
+            telegram_ids.append(int(token))
+        elif key == "name":
+            selection["username_pattern"] = value
+        elif key == "from":
+            selection["created_from"] = datetime.fromisoformat(value)
+        elif key == "to":
+            selection["created_to"] = datetime.fromisoformat(value)
+        else:
+            raise ValueError(f"Неизвестное условие: {token}")
+    if telegram_ids:
+        selection["telegram_ids"] = telegram_ids
+    if not selection:
+        raise ValueError("Не заданы условия выборки")
+    return selection
+
+async def apply_role(
+    message: Message,
+    role: str,
+    args: Optional[str],
+    user: Optional[User],
+    from_role: Optional[str] = None
+):
+    """Назначение роли выбранным пользователям"""
+    try:
+        selection = parse_selection(args or "")
+    except ValueError:
+        return await message.answer(SETROLE_USAGE_TEXT)
+
+    try:
+        async with session_router.write() as session:
+            changed = await bulk_set_role(
+                session,
+                role,
+                performed_by=user.id if user else None,
+                from_role=from_role,
+                reason=message.text[:255],
+                **selection
+            )
+            await session.commit()
+    except Exception as e:
+        logger.error(f"Ошибка массовой смены роли: {str(e)}", exc_info=True)
+        return await message.answer(SETROLE_ERROR_TEXT.format(error=e))
+
+    # Кеши ролей сбрасываются только после commit
+    await role_events.publish(changed, role)
+
+    if not changed:
+        return await message.answer(SETROLE_NOTHING_TEXT)
+    await message.answer(SETROLE_DONE_TEXT.format(role=role, count=len(changed)))
+
+async def set_role_command(message: Message, command: CommandObject, user: Optional[User] = None):
+    """/setrole <ROLE> <условия>"""
+    role, _, args = (command.args or "").partition(" ")
+    if role.upper() not in ROLES:
+        return await message.answer(SETROLE_USAGE_TEXT)
+    await apply_role(message, role.upper(), args, user)
+
+async def ban_command(message: Message, command: CommandObject, user: Optional[User] = None):
+    """/ban <условия> - только для USER (сотрудников - явно через /setrole BANNED)"""
+    await apply_role(message, "BANNED", command.args, user, from_role="USER")
+
+async def unban_command(message: Message, command: CommandObject, user: Optional[User] = None):
+    """/unban <условия> - только для заблокированных"""
+    await apply_role(message, "USER", command.args, user, from_role="BANNED")
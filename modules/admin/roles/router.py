@@ -0,0 +1,11 @@
+from aiogram import Router
+from aiogram.filters import Command
+from .handlers import set_role_command, ban_command, unban_command
+from core.filters import IsAdmin
+
+roles_router = Router()
+roles_router.message.filter(IsAdmin)
+
+roles_router.message.register(set_role_command, Command("setrole"))
+roles_router.message.register(ban_command, Command("ban"))
+roles_router.message.register(unban_command, Command("unban"))
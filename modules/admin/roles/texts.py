@@ -0,0 +1,17 @@
+SETROLE_USAGE_TEXT = """
+Использование:
+/setrole <ROLE> <условия>
+/ban <условия> - только пользователи с ролью USER
+/unban <условия> - только заблокированные
+
+Условия (можно сочетать):
+▫️ 123456 789012 - telegram_id через пробел
+▫️ name:spam% - шаблон username
+▫️ from:2026-10-01 to:2026-10-02 - окно регистрации
+
+Роли: ADMIN, SUPPORT, USER, BANNED
+"""
+
+SETROLE_DONE_TEXT = "✅ Роль {role} назначена пользователям: {count}"
+SETROLE_NOTHING_TEXT = "ℹ️ Подходящих пользователей не найдено"
+SETROLE_ERROR_TEXT = "⚠️ Не удалось изменить роли: {error}"
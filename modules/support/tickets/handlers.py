@@ -0,0 +1,104 @@
+from aiogram.filters import CommandObject
+from aiogram.fsm.context import FSMContext
+from aiogram.types import Message, CallbackQuery
+from aiogram.exceptions import TelegramBadRequest
+from core.database.crud import search_tickets
+from core.database.database import session_router
+from core.database.model import User
+from .texts import (
+    SEARCH_USAGE_TEXT, SEARCH_RESULTS_TEXT, SEARCH_ITEM_TEXT, SEARCH_EMPTY_TEXT,
+    SEARCH_EXPIRED_TEXT, STATUS_FILTERS, PAGE_SIZE, PREVIEW_LENGTH
+)
+from .keyboards import get_search_kb
+from typing import Any, Dict, Optional, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+def parse_search(args: str, user: Optional[User]) -> Dict[str, Any]:
+    """Фильтры в начале запроса (#open, @me), остальное - текст поиска"""
+    search: Dict[str, Any] = {"status": None, "assigned_to": None}
+    words = args.split()
+    while words:
+        word = words[0].lower()
+        if word in STATUS_FILTERS:
+            search["status"] = STATUS_FILTERS[word]
+        elif word == "@me":
+            search["assigned_to"] = user.id if user else None
+        else:
+            break
+        words.pop(0)
+    search["query"] = " ".join(words)
+    return search
+
+async def render_page(
+    telegram_id: int,
+    search: Dict[str, Any]
+) -> Tuple[str, bool, Optional[Tuple[float, int]]]:
+    """Текст страницы, есть ли следующая и курсор для нее"""
+    after = tuple(search["after"]) if search.get("after") else None
+    async with session_router.read(telegram_id) as session:
+        results = await search_tickets(
+            session,
+            search["query"],
+            status=search["status"],
+            assigned_to=search["assigned_to"],
+            after=after,
+            limit=PAGE_SIZE + 1
+        )
+
+    has_next = len(results) > PAGE_SIZE
+    results = results[:PAGE_SIZE]
+    if not results:
+        return SEARCH_EMPTY_TEXT.format(query=search["query"]), False, None
+
+    items = "\n".join(
+        SEARCH_ITEM_TEXT.format(
+            id=ticket.id,
+            status=ticket.status,
+            preview=" ".join(ticket.message.split())[:PREVIEW_LENGTH]
+        )
+        for ticket, _ in results
+    )
+    last_ticket, last_rank = results[-1]
+    text = SEARCH_RESULTS_TEXT.format(query=search["query"], items=items)
+    return text, has_next, (last_rank, last_ticket.id)
+
+async def search_command(
+    message: Message,
+    command: CommandObject,
+    state: FSMContext,
+    user: Optional[User] = None
+):
+    """Обработчик /search для сотрудников поддержки"""
+    search = parse_search(command.args or "", user)
+    if not search["query"]:
+        return await message.answer(SEARCH_USAGE_TEXT)
+
+    try:
+        text, has_next, cursor = await render_page(message.from_user.id, search)
+        # Запрос и курсор следующей страницы - в данных FSM (в callback_data не помещаются)
+        await state.update_data(ticket_search={**search, "after": cursor})
+        await message.answer(text, reply_markup=get_search_kb(has_next))
+    except Exception as e:
+        logger.error(f"Ошибка в search_command: {str(e)}", exc_info=True)
+        await message.answer("⚠️ Ошибка поиска")
+
+async def search_next_page(callback: CallbackQuery, state: FSMContext):
+    """Следующая страница результатов поиска"""
+    try:
+        search = (await state.get_data()).get("ticket_search")
+        if not search or not search.get("after"):
+            return await callback.answer(SEARCH_EXPIRED_TEXT, show_alert=True)
+        await callback.answer()
+
+        text, has_next, cursor = await render_page(callback.from_user.id, search)
+        await state.update_data(ticket_search={**search, "after": cursor})
+        try:
+            await callback.message.edit_text(text, reply_markup=get_search_kb(has_next))
+        except TelegramBadRequest:
+            pass
+
+    except Exception as e:
+        logger.error(f"Ошибка в search_next_page: {str(e)}", exc_info=True)
+        await callback.answer("⚠️ Ошибка поиска", show_alert=True)
@@ -0,0 +1,8 @@
+from aiogram.utils.keyboard import InlineKeyboardBuilder
+from .texts import NEXT_PAGE_BUTTON, SEARCH_NEXT_CALLBACK
+
+def get_search_kb(has_next: bool) -> InlineKeyboardBuilder:
+    builder = InlineKeyboardBuilder()
+    if has_next:
+        builder.button(text=NEXT_PAGE_BUTTON, callback_data=SEARCH_NEXT_CALLBACK)
+    return builder.as_markup()
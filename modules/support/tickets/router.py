@@ -0,0 +1,15 @@
+from aiogram import Router, F
+from aiogram.filters import Command
+from .handlers import search_command, search_next_page
+from .texts import SEARCH_NEXT_CALLBACK
+from core.filters import IsStaff
+
+tickets_router = Router()
+tickets_router.message.filter(IsStaff)
+tickets_router.callback_query.filter(IsStaff)
+
+tickets_router.message.register(search_command, Command("search"))
+tickets_router.callback_query.register(
+    search_next_page,
+    F.data == SEARCH_NEXT_CALLBACK
+)
@@ -0,0 +1,27 @@
+SEARCH_USAGE_TEXT = """
+🔎 Поиск по тикетам:
+/search <текст>
+
+Фильтры (перед текстом):
+▫️ #open, #progress, #closed - статус
+▫️ @me - назначенные на меня
+"""
+
+SEARCH_RESULTS_TEXT = "🔎 Результаты по запросу «{query}»:\n\n{items}"
+SEARCH_ITEM_TEXT = "#{id} [{status}] {preview}"
+SEARCH_EMPTY_TEXT = "🔎 По запросу «{query}» ничего не найдено"
+SEARCH_EXPIRED_TEXT = "Поиск устарел, повторите /search"
+
+NEXT_PAGE_BUTTON = "➡️ Далее"
+
+SEARCH_NEXT_CALLBACK = "tickets:search:next"
+
+STATUS_FILTERS = {
+    "#open": "OPEN",
+    "#progress": "IN_PROGRESS",
+    "#closed": "CLOSED",
+}
+
+# Тикетов на странице и длина превью
+PAGE_SIZE = 10
+PREVIEW_LENGTH = 80
@@ -3,10 +3,12 @@ from aiogram.filters import Command
 from .handlers import start_command
 from core.filters import IsNotBanned
 from ..profile.router import profile_router
+from ..subscription.router import subscription_router
 from .texts import MAIN_MENU_CALLBACK
 main_menu_router = Router()
 main_menu_router.callback_query.filter(IsNotBanned)
 main_menu_router.include_router(profile_router)
+main_menu_router.include_router(subscription_router)
 # Обработка команды /start
 main_menu_router.message.register(
     start_command,
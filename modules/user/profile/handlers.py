@@ -4,7 +4,7 @@ from aiogram.exceptions import TelegramBadRequest
 from core.database.crud import get_user_full_data
 from .texts import PROFILE_TEXT
 from .keyboards import get_profile_kb
-from core.database.database import async_session
+from core.database.database import session_router
 import logging
 
 logger = logging.getLogger(__name__)
@@ -15,7 +15,8 @@ async def show_profile(callback: CallbackQuery):
         # Убираем индикатор загрузки сразу
         await callback.answer()
 
-        async with async_session() as session:
+        # Только чтение - запрос может уйти на реплику
+        async with session_router.read(callback.from_user.id) as session:
             user_data = await get_user_full_data(session, callback.from_user.id)
             
             if not user_data:
@@ -0,0 +1,97 @@
+from aiogram.types import CallbackQuery, FSInputFile
+from aiogram.exceptions import TelegramBadRequest
+from core.database.crud import get_user_subscription
+from core.database.database import session_router
+from core.marzban_api.api import MarzbanAPI
+from core.marzban_api.cache import subscription_cache
+from core.qr import qr_cache
+from .texts import (
+    SUBSCRIPTION_TEXT, NO_SUBSCRIPTION_TEXT, LINKS_HEADER, MAX_LINKS
+)
+from .keyboards import get_subscription_kb
+from typing import Optional, Dict, Any
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+async def load_subscription(
+    marzban_api: MarzbanAPI,
+    telegram_id: int
+) -> Optional[Dict[str, Any]]:
+    """Подписка пользователя из БД + ссылки из Marzban (из кеша, если есть)"""
+    async with session_router.read(telegram_id) as session:
+        subscription = await get_user_subscription(session, telegram_id)
+
+    if not subscription:
+        return None
+
+    username = subscription.marzban_username
+    links = subscription_cache.get(username)
+    if links is None:
+        # Клиент Marzban синхронный - выполняем в потоке
+        links = await asyncio.to_thread(marzban_api.get_subscription, username)
+    if not links:
+        return None
+
+    return {
+        "expires_at": subscription.expires_at,
+        **links
+    }
+
+async def show_subscription(callback: CallbackQuery, marzban_api: MarzbanAPI):
+    """Обработчик показа подписки пользователя"""
+    try:
+        await callback.answer()
+
+        subscription = await load_subscription(marzban_api, callback.from_user.id)
+        if not subscription:
+            text = NO_SUBSCRIPTION_TEXT
+        else:
+            links = subscription["links"][:MAX_LINKS]
+            text = SUBSCRIPTION_TEXT.format(
+                expires_at=subscription["expires_at"].strftime("%d.%m.%Y"),
+                subscription_url=subscription["subscription_url"],
+                links="\n".join([LINKS_HEADER, *links]) if links else ""
+            )
+
+        try:
+            await callback.message.edit_text(
+                text=text,
+                reply_markup=get_subscription_kb(bool(subscription)),
+                disable_web_page_preview=True
+            )
+        except TelegramBadRequest:
+            # Если сообщение не изменилось, игнорируем
+            pass
+
+    except Exception as e:
+        logger.error(f"Ошибка в show_subscription: {str(e)}", exc_info=True)
+        await callback.answer("⚠️ Произошла ошибка при загрузке подписки", show_alert=True)
+
+async def send_subscription_qr(callback: CallbackQuery, marzban_api: MarzbanAPI):
+    """Отправка QR-кода ссылки подписки"""
+    try:
+        subscription = await load_subscription(marzban_api, callback.from_user.id)
+        if not subscription or not subscription["subscription_url"]:
+            return await callback.answer("❌ Подписка не найдена", show_alert=True)
+        await callback.answer()
+
+        data = subscription["subscription_url"]
+
+        # Повторно используем уже загруженную в Telegram картинку
+        file_id = await qr_cache.get_file_id(data)
+        if file_id:
+            try:
+                await callback.message.answer_photo(photo=file_id)
+                return
+            except TelegramBadRequest:
+                logger.warning("Cached QR file_id is no longer valid, re-uploading")
+
+        path = await qr_cache.get_png(data)
+        message = await callback.message.answer_photo(photo=FSInputFile(path))
+        await qr_cache.remember_file_id(data, message.photo[-1].file_id)
+
+    except Exception as e:
+        logger.error(f"Ошибка в send_subscription_qr: {str(e)}", exc_info=True)
+        await callback.answer("⚠️ Не удалось получить QR-код", show_alert=True)
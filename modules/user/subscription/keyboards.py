@@ -0,0 +1,11 @@
+from aiogram.utils.keyboard import InlineKeyboardBuilder
+from .texts import QR_BUTTON, BACK_BUTTON, SUBSCRIPTION_QR_CALLBACK
+from modules.user.main_menu.texts import MAIN_MENU_CALLBACK
+
+def get_subscription_kb(has_subscription: bool) -> InlineKeyboardBuilder:
+    builder = InlineKeyboardBuilder()
+    if has_subscription:
+        builder.button(text=QR_BUTTON, callback_data=SUBSCRIPTION_QR_CALLBACK)
+    builder.button(text=BACK_BUTTON, callback_data=MAIN_MENU_CALLBACK)
+    builder.adjust(1)
+    return builder.as_markup()
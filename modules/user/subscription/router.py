@@ -0,0 +1,15 @@
+from aiogram import Router, F
+from .handlers import show_subscription, send_subscription_qr
+from .texts import SUBSCRIPTION_QR_CALLBACK
+from modules.user.main_menu.texts import SUBSCRIPTION_CALLBACK
+
+subscription_router = Router()
+
+subscription_router.callback_query.register(
+    show_subscription,
+    F.data == SUBSCRIPTION_CALLBACK
+)
+subscription_router.callback_query.register(
+    send_subscription_qr,
+    F.data == SUBSCRIPTION_QR_CALLBACK
+)
@@ -0,0 +1,21 @@
+SUBSCRIPTION_TEXT = """
+💎 Ваша подписка
+
+▫️ Действует до: {expires_at}
+▫️ Ссылка подписки:
+{subscription_url}
+
+{links}
+"""
+
+NO_SUBSCRIPTION_TEXT = "💎 У вас пока нет активной подписки"
+
+LINKS_HEADER = "▫️ Конфигурации:"
+
+QR_BUTTON = "📷 QR-код"
+BACK_BUTTON = "🔙 Назад"
+
+SUBSCRIPTION_QR_CALLBACK = "subscription:qr"
+
+# Сколько конфигураций показывать в сообщении
+MAX_LINKS = 5
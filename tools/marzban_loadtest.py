@@ -0,0 +1,206 @@
+"""
+Нагрузочный тест клиента MarzbanAPI.
+
+Против поднятого mock-сервера:
+    python -m tools.marzban_loadtest --url http://127.0.0.1:8800 --concurrency 32 --requests 5000
+
+Со встроенным mock-сервером и имитацией сбоев:
+    python -m tools.marzban_loadtest --mock --latency-ms 30 --error-rate 0.05 --token-ttl 5
+"""
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Tuple
+import argparse
+import asyncio
+import logging
+import random
+import threading
+import time
+
+from core.config import Config
+from core.marzban_api.api import MarzbanAPI
+from tools.marzban_mock import add_fault_arguments, build_app, faults_from_args
+
+# Вес операций в смешанном сценарии
+SCENARIO = {
+    "get_user": 60,
+    "get_user_usage": 20,
+    "get_users": 10,
+    "get_system_stats": 5,
+    "get_all_nodes": 5,
+}
+
+
+def percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    index = min(len(values) - 1, int(round(pct / 100 * (len(values) - 1))))
+    return values[index]
+
+
+def start_mock(args: argparse.Namespace) -> Tuple[str, Callable[[], None]]:
+    """Запуск mock-сервера в отдельном потоке со своим циклом событий"""
+    from aiohttp import web
+
+    ready = threading.Event()
+    loop = asyncio.new_event_loop()
+    base_url = f"http://127.0.0.1:{args.mock_port}"
+    runner_holder = {}
+
+    async def serve():
+        app = build_app(
+            faults=faults_from_args(args),
+            users_count=args.users,
+            seed=args.seed,
+            base_url=base_url
+        )
+        runner = web.AppRunner(app, access_log=None)
+        await runner.setup()
+        await web.TCPSite(runner, "127.0.0.1", args.mock_port).start()
+        runner_holder["runner"] = runner
+        ready.set()
+
+    def run():
+        asyncio.set_event_loop(loop)
+        loop.run_until_complete(serve())
+        loop.run_forever()
+
+    thread = threading.Thread(target=run, name="marzban-mock", daemon=True)
+    thread.start()
+    ready.wait(10)
+
+    def stop():
+        asyncio.run_coroutine_threadsafe(runner_holder["runner"].cleanup(), loop).result(10)
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join(10)
+
+    return base_url, stop
+
+
+def make_client(url: str, username: str, password: str) -> MarzbanAPI:
+    Config.MARZBAN_URL = url
+    Config.MARZBAN_USERNAME = username
+    Config.MARZBAN_PASSWORD = password
+    return MarzbanAPI()
+
+
+def run_load(
+    api: MarzbanAPI,
+    usernames: List[str],
+    concurrency: int,
+    total_requests: int,
+    duration: float,
+    seed: int
+) -> Dict[str, object]:
+    """Выполняет операции сценария, возвращает замеры"""
+    operations = list(SCENARIO)
+    weights = [SCENARIO[name] for name in operations]
+    rnd = random.Random(seed)
+    plan = [
+        (rnd.choices(operations, weights)[0], rnd.choice(usernames))
+        for _ in range(total_requests)
+    ]
+
+    latencies: List[float] = []
+    errors: Counter = Counter()
+    lock = threading.Lock()
+    deadline = time.perf_counter() + duration if duration else None
+
+    def call(operation: str, username: str) -> None:
+        if deadline and time.perf_counter() > deadline:
+            return
+        started = time.perf_counter()
+        try:
+            method = getattr(api, operation)
+            if operation in ("get_user", "get_user_usage"):
+                method(username)
+            else:
+                method()
+            error = None
+        except Exception as e:
+            error = f"{type(e).__name__}: {str(e)[:60]}"
+        elapsed = time.perf_counter() - started
+        with lock:
+            latencies.append(elapsed)
+            if error:
+                errors[error] += 1
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for operation, username in plan:
+            pool.submit(call, operation, username)
+    wall = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "errors": sum(errors.values()),
+        "wall": wall,
+        "throughput": len(latencies) / wall if wall else 0.0,
+        "p50": percentile(latencies, 50),
+        "p90": percentile(latencies, 90),
+        "p99": percentile(latencies, 99),
+        "p999": percentile(latencies, 99.9),
+        "max": latencies[-1] if latencies else 0.0,
+        "error_kinds": errors,
+    }
+
+
+def print_report(result: Dict[str, object], concurrency: int) -> None:
+    print(f"concurrency:  {concurrency}")
+    print(f"requests:     {result['requests']} ({result['errors']} errors)")
+    print(f"wall time:    {result['wall']:.2f} s")
+    print(f"throughput:   {result['throughput']:.1f} req/s")
+    for key in ("p50", "p90", "p99", "p999", "max"):
+        print(f"{key + ':':<13} {result[key] * 1000:.1f} ms")
+    for error, count in result["error_kinds"].most_common(10):
+        print(f"  {count:>6}  {error}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test for MarzbanAPI")
+    parser.add_argument("--url", default="http://127.0.0.1:8800")
+    parser.add_argument("--username", default="admin")
+    parser.add_argument("--password", default="admin")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--duration", type=float, default=0.0, help="ограничение по времени, с")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--mock", action="store_true", help="поднять mock-сервер в процессе")
+    parser.add_argument("--mock-port", type=int, default=8801)
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--verbose", action="store_true", help="выводить логи клиента")
+    add_fault_arguments(parser)
+    args = parser.parse_args()
+
+    # Ошибки клиента попадают в отчет, в логах они только мешают
+    logging.basicConfig(level=logging.WARNING if args.verbose else logging.CRITICAL)
+
+    stop_mock = None
+    url = args.url
+    if args.mock:
+        url, stop_mock = start_mock(args)
+
+    try:
+        api = make_client(url, args.username, args.password)
+        try:
+            usernames = [user["username"] for user in api.get_users(limit=1000)]
+        except Exception:
+            # Панель недоступна - берем имена из детерминированного набора mock-сервера
+            usernames = [f"user{i:05d}" for i in range(args.users)]
+        result = run_load(
+            api,
+            usernames,
+            concurrency=args.concurrency,
+            total_requests=args.requests,
+            duration=args.duration,
+            seed=args.seed
+        )
+        print_report(result, args.concurrency)
+    finally:
+        if stop_mock:
+            stop_mock()
+
+
+if __name__ == "__main__":
+    main()
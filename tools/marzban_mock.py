@@ -0,0 +1,360 @@
+"""
+Локальный mock-сервер Marzban для тестов без реальной панели.
+
+Запуск:
+    python -m tools.marzban_mock --port 8800 --users 1000 --latency-ms 20 --error-rate 0.01
+
+Поведение панели меняется на лету:
+    POST /mock/faults {"error_rate": 1.0}   - имитация падения панели
+    GET  /mock/stats                        - счетчики запросов
+"""
+from dataclasses import dataclass, asdict, fields
+from typing import Any, Dict, Optional
+from aiohttp import web
+import argparse
+import asyncio
+import logging
+import random
+import secrets
+import time
+
+logger = logging.getLogger(__name__)
+
+GB = 1024 ** 3
+
+
+@dataclass
+class Faults:
+    """Искусственные задержки и ошибки"""
+    latency_ms: float = 0.0
+    jitter_ms: float = 0.0
+    error_rate: float = 0.0        # доля ответов 500
+    rate_limit_rate: float = 0.0   # доля ответов 429
+    retry_after: int = 1
+    token_ttl: float = 3600.0      # после истечения - 401
+
+
+def seed_users(count: int, seed: int, base_url: str) -> Dict[str, Dict[str, Any]]:
+    """Детерминированный набор пользователей"""
+    rnd = random.Random(seed)
+    now = int(time.time())
+    users = {}
+    for i in range(count):
+        username = f"user{i:05d}"
+        users[username] = make_user(
+            username,
+            base_url,
+            status=rnd.choice(["active", "active", "active", "disabled", "limited", "expired"]),
+            used_traffic=rnd.randint(0, 50 * GB),
+            data_limit=rnd.choice([None, 10 * GB, 50 * GB, 100 * GB]),
+            expire=rnd.choice([None, now + rnd.randint(-30, 90) * 86400]),
+            uuid_seed=rnd.getrandbits(128),
+        )
+    return users
+
+
+def make_user(
+    username: str,
+    base_url: str,
+    status: str = "active",
+    used_traffic: int = 0,
+    data_limit: Optional[int] = None,
+    expire: Optional[int] = None,
+    uuid_seed: Optional[int] = None,
+    **extra: Any
+) -> Dict[str, Any]:
+    uuid_value = f"{uuid_seed if uuid_seed is not None else random.getrandbits(128):032x}"
+    uuid_value = "-".join((
+        uuid_value[:8], uuid_value[8:12], uuid_value[12:16], uuid_value[16:20], uuid_value[20:32]
+    ))
+    token = secrets.token_urlsafe(24)
+    user = {
+        "username": username,
+        "status": status,
+        "used_traffic": used_traffic,
+        "lifetime_used_traffic": used_traffic,
+        "data_limit": data_limit,
+        "data_limit_reset_strategy": "no_reset",
+        "expire": expire,
+        "proxies": {"vless": {"id": uuid_value, "flow": ""}},
+        "inbounds": {"vless": ["VLESS TCP REALITY"]},
+        "note": "",
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "links": [f"vless://{uuid_value}@mock.local:443?security=reality#{username}"],
+        "subscription_url": f"{base_url}/sub/{token}",
+    }
+    user.update(extra)
+    return user
+
+
+class MockMarzban:
+    def __init__(
+        self,
+        faults: Faults,
+        users: Dict[str, Dict[str, Any]],
+        admin_username: str = "admin",
+        admin_password: str = "admin",
+        seed: int = 0
+    ):
+        self.faults = faults
+        self.users = users
+        self.admin_username = admin_username
+        self.admin_password = admin_password
+        self.tokens: Dict[str, float] = {}
+        self.rnd = random.Random(seed)
+        self.stats: Dict[str, int] = {
+            "requests": 0, "ok": 0, "401": 0, "404": 0, "429": 0, "500": 0
+        }
+        self.nodes = [
+            {
+                "id": i,
+                "name": f"node-{i}",
+                "address": f"10.0.0.{i}",
+                "port": 62050,
+                "api_port": 62051,
+                "usage_coefficient": 1.0,
+                "status": "connected",
+                "xray_version": "1.8.24",
+            }
+            for i in range(1, 4)
+        ]
+
+    # --- Инфраструктура ---
+
+    @web.middleware
+    async def faults_middleware(self, request: web.Request, handler):
+        self.stats["requests"] += 1
+        if request.path.startswith("/mock/"):
+            return await handler(request)
+
+        delay = self.faults.latency_ms + self.rnd.uniform(0, self.faults.jitter_ms)
+        if delay > 0:
+            await asyncio.sleep(delay / 1000)
+
+        roll = self.rnd.random()
+        if roll < self.faults.rate_limit_rate:
+            self.stats["429"] += 1
+            return web.json_response(
+                {"detail": "Too Many Requests"},
+                status=429,
+                headers={"Retry-After": str(self.faults.retry_after)}
+            )
+        if roll < self.faults.rate_limit_rate + self.faults.error_rate:
+            self.stats["500"] += 1
+            return web.json_response({"detail": "Internal Server Error"}, status=500)
+
+        if request.path != "/api/admin/token" and not self._authorized(request):
+            self.stats["401"] += 1
+            return web.json_response({"detail": "Could not validate credentials"}, status=401)
+
+        try:
+            response = await handler(request)
+        except web.HTTPNotFound:
+            self.stats["404"] += 1
+            raise
+        if response.status == 404:
+            self.stats["404"] += 1
+        else:
+            self.stats["ok"] += 1
+        return response
+
+    def _authorized(self, request: web.Request) -> bool:
+        header = request.headers.get("Authorization", "")
+        if not header.startswith("Bearer "):
+            return False
+        issued_at = self.tokens.get(header[7:])
+        return issued_at is not None and time.time() - issued_at < self.faults.token_ttl
+
+    def _get_user_or_404(self, request: web.Request) -> Dict[str, Any]:
+        user = self.users.get(request.match_info["username"])
+        if user is None:
+            raise web.HTTPNotFound(
+                text='{"detail": "User not found"}', content_type="application/json"
+            )
+        return user
+
+    # --- API Marzban ---
+
+    async def token(self, request: web.Request) -> web.Response:
+        form = await request.post()
+        if form.get("username") != self.admin_username or form.get("password") != self.admin_password:
+            return web.json_response({"detail": "Incorrect username or password"}, status=401)
+        access_token = secrets.token_hex(16)
+        self.tokens[access_token] = time.time()
+        return web.json_response({"access_token": access_token, "token_type": "bearer"})
+
+    async def list_users(self, request: web.Request) -> web.Response:
+        offset = int(request.query.get("offset", 0))
+        limit = int(request.query.get("limit", 100))
+        status = request.query.get("status")
+        users = [u for u in self.users.values() if not status or u["status"] == status]
+        return web.json_response({"users": users[offset:offset + limit], "total": len(users)})
+
+    async def create_user(self, request: web.Request) -> web.Response:
+        payload = await request.json()
+        username = payload.get("username")
+        if not username:
+            return web.json_response({"detail": "username is required"}, status=422)
+        if username in self.users:
+            return web.json_response({"detail": "User already exists"}, status=409)
+        base_url = f"{request.scheme}://{request.host}"
+        user = make_user(base_url=base_url, **payload)
+        self.users[username] = user
+        return web.json_response(user)
+
+    async def get_user(self, request: web.Request) -> web.Response:
+        return web.json_response(self._get_user_or_404(request))
+
+    async def update_user(self, request: web.Request) -> web.Response:
+        user = self._get_user_or_404(request)
+        user.update(await request.json())
+        return web.json_response(user)
+
+    async def delete_user(self, request: web.Request) -> web.Response:
+        self._get_user_or_404(request)
+        del self.users[request.match_info["username"]]
+        return web.json_response({"detail": "User successfully deleted"})
+
+    async def user_usage(self, request: web.Request) -> web.Response:
+        user = self._get_user_or_404(request)
+        usages = [
+            {"node_id": node["id"], "node_name": node["name"], "used_traffic": user["used_traffic"] // len(self.nodes)}
+            for node in self.nodes
+        ]
+        return web.json_response({"username": user["username"], "usages": usages})
+
+    async def revoke_sub(self, request: web.Request) -> web.Response:
+        user = self._get_user_or_404(request)
+        base_url = f"{request.scheme}://{request.host}"
+        user["subscription_url"] = f"{base_url}/sub/{secrets.token_urlsafe(24)}"
+        return web.json_response(user)
+
+    async def reset_traffic(self, request: web.Request) -> web.Response:
+        user = self._get_user_or_404(request)
+        user["used_traffic"] = 0
+        return web.json_response(user)
+
+    async def list_nodes(self, request: web.Request) -> web.Response:
+        # Как в реальной панели - список, без обертки
+        return web.json_response(self.nodes)
+
+    async def get_node(self, request: web.Request) -> web.Response:
+        node_id = int(request.match_info["node_id"])
+        for node in self.nodes:
+            if node["id"] == node_id:
+                return web.json_response(node)
+        return web.json_response({"detail": "Node not found"}, status=404)
+
+    async def system(self, request: web.Request) -> web.Response:
+        users = self.users.values()
+        return web.json_response({
+            "version": "mock",
+            "mem_total": 8 * GB,
+            "mem_used": 3 * GB,
+            "cpu_cores": 8,
+            "cpu_usage": round(self.rnd.uniform(1, 60), 1),
+            "total_user": len(self.users),
+            "users_active": sum(1 for u in users if u["status"] == "active"),
+            "incoming_bandwidth": 0,
+            "outgoing_bandwidth": sum(u["used_traffic"] for u in users),
+        })
+
+    # --- Управление mock-сервером ---
+
+    async def set_faults(self, request: web.Request) -> web.Response:
+        payload = await request.json()
+        known = {f.name for f in fields(Faults)}
+        for key, value in payload.items():
+            if key in known:
+                setattr(self.faults, key, type(getattr(self.faults, key))(value))
+        if payload.get("expire_tokens"):
+            self.tokens.clear()
+        logger.info("Faults updated: %s", asdict(self.faults))
+        return web.json_response(asdict(self.faults))
+
+    async def get_stats(self, request: web.Request) -> web.Response:
+        return web.json_response({**self.stats, "faults": asdict(self.faults)})
+
+    def make_app(self) -> web.Application:
+        app = web.Application(middlewares=[self.faults_middleware])
+        app.router.add_post("/api/admin/token", self.token)
+        app.router.add_get("/api/users", self.list_users)
+        app.router.add_post("/api/user", self.create_user)
+        app.router.add_get("/api/user/{username}", self.get_user)
+        app.router.add_put("/api/user/{username}", self.update_user)
+        app.router.add_delete("/api/user/{username}", self.delete_user)
+        app.router.add_get("/api/user/{username}/usage", self.user_usage)
+        app.router.add_post("/api/user/{username}/revoke_sub", self.revoke_sub)
+        app.router.add_post("/api/user/{username}/reset_traffic", self.reset_traffic)
+        app.router.add_get("/api/nodes", self.list_nodes)
+        app.router.add_get("/api/node/{node_id}", self.get_node)
+        app.router.add_get("/api/system", self.system)
+        app.router.add_post("/mock/faults", self.set_faults)
+        app.router.add_get("/mock/stats", self.get_stats)
+        return app
+
+
+def build_app(
+    faults: Optional[Faults] = None,
+    users_count: int = 100,
+    seed: int = 42,
+    base_url: str = "http://127.0.0.1:8800",
+    admin_username: str = "admin",
+    admin_password: str = "admin"
+) -> web.Application:
+    """Приложение mock-сервера с предзаполненными данными"""
+    mock = MockMarzban(
+        faults=faults or Faults(),
+        users=seed_users(users_count, seed, base_url),
+        admin_username=admin_username,
+        admin_password=admin_password,
+        seed=seed
+    )
+    app = mock.make_app()
+    app["mock"] = mock
+    return app
+
+
+def add_fault_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0)
+    parser.add_argument("--token-ttl", type=float, default=3600.0)
+
+
+def faults_from_args(args: argparse.Namespace) -> Faults:
+    return Faults(
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        error_rate=args.error_rate,
+        rate_limit_rate=args.rate_limit_rate,
+        token_ttl=args.token_ttl,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mock Marzban API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8800)
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--admin-username", default="admin")
+    parser.add_argument("--admin-password", default="admin")
+    add_fault_arguments(parser)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+    app = build_app(
+        faults=faults_from_args(args),
+        users_count=args.users,
+        seed=args.seed,
+        base_url=f"http://{args.host}:{args.port}",
+        admin_username=args.admin_username,
+        admin_password=args.admin_password
+    )
+    web.run_app(app, host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()